@@ -18,8 +18,9 @@ from django.conf import settings
 
 from auth_API.helpers import get_or_create_user_information
 from daphne_API.background_search import send_archs_from_queue_to_main_dataset, send_archs_back
-from daphne_API.design_helpers import add_design
-from daphne_API.models import Design
+from daphne_API.design_helpers import add_design, add_designs, get_design
+from daphne_API import dataset_cache
+from daphne_API.models import Design, EOSSContext
 
 SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
 
@@ -84,20 +85,8 @@ class EvaluateArchitecture(APIView):
 
             architecture = self.VASSARClient.evaluateArchitecture(user_info.eosscontext.problem, inputs)
 
-            is_same = True
-            for old_arch in user_info.eosscontext.design_set.all():
-                is_same = True
-                old_arch_outputs = json.loads(old_arch.outputs)
-                for i in range(len(old_arch_outputs)):
-                    if old_arch_outputs[i] != architecture['outputs'][i]:
-                        is_same = False
-                if is_same:
-                    break
-
-            if not is_same:
-                architecture['id'] = user_info.eosscontext.last_arch_id
-                print(user_info.eosscontext.last_arch_id)
-                add_design(architecture, user_info.eosscontext, False)
+            if add_design(architecture, user_info.eosscontext, False):
+                logger.debug('Added architecture ' + str(architecture['id']) + ' to the dataset')
 
             user_info.save()
 
@@ -124,11 +113,7 @@ class RunLocalSearch(APIView):
             inputs = request.data['inputs']
             inputs = json.loads(inputs)
 
-            architectures = self.VASSARClient.runLocalSearch(inputs)
-
-            for arch in architectures:
-                arch['id'] = user_info.eosscontext.last_arch_id
-                add_design(arch, user_info.eosscontext, False)
+            architectures = add_designs(self.VASSARClient.runLocalSearch(inputs), user_info.eosscontext, False)
 
             user_info.save()
 
@@ -148,7 +133,7 @@ class ChangePort(APIView):
         new_port = request.data['port']
         user_info = get_or_create_user_information(request.session, request.user, 'EOSS')
         user_info.eosscontext.vassar_port = new_port
-        user_info.eosscontext.save()
+        user_info.eosscontext.save(update_fields=['vassar_port'])
         user_info.save()
         return Response('')
 
@@ -169,26 +154,15 @@ class StartGA(APIView):
                     message = json.loads(body)
                     if message['type'] == 'new_arch':
                         print('Processing some new archs!')
-                        nonlocal inputs_unique_set
                         # Archs are added one by one
-                        new_archs = [message['data']]
-                        send_back = []
+                        new_archs = [{
+                            'inputs': message['data']['inputs'],
+                            'outputs': message['data']['outputs']
+                        }]
                         # Add archs to the context data before sending back to user
-                        for arch in new_archs:
-                            hashed_input = hash(tuple(arch['inputs']))
-                            if hashed_input not in inputs_unique_set:
-                                full_arch = {
-                                    'id': thread_user_info.eosscontext.last_arch_id,
-                                    'inputs': arch['inputs'],
-                                    'outputs': arch['outputs']
-                                }
-                                if thread_user_info.eosscontext.activecontext.show_background_search_feedback:
-                                    add_design(full_arch, thread_user_info.eosscontext, False)
-                                else:
-                                    add_design(full_arch, thread_user_info.eosscontext, True)
-                                send_back.append(full_arch)
-                                inputs_unique_set.add(hashed_input)
-                                thread_user_info.save()
+                        active = not thread_user_info.eosscontext.activecontext.show_background_search_feedback
+                        send_back = add_designs(new_archs, thread_user_info.eosscontext, active)
+                        thread_user_info.save()
 
                         # Look for channel to send back to user
                         channel_layer = get_channel_layer()
@@ -243,28 +217,25 @@ class StartGA(APIView):
 
                 # Restart archs queue before starting the GA again
                 Design.objects.filter(activecontext__exact=user_info.eosscontext.activecontext).delete()
-                user_info.eosscontext.last_arch_id = user_info.eosscontext.design_set.count()
-                user_info.eosscontext.save()
+                dataset = dataset_cache.cache.get(user_info.eosscontext)
+                user_info.eosscontext.last_arch_id = int(dataset.ids.max()) + 1 if len(dataset) > 0 else 0
+                EOSSContext.objects.filter(id=user_info.eosscontext.id)\
+                    .update(last_arch_id=user_info.eosscontext.last_arch_id)
 
                 # Convert the architecture list and wait for threads to be available (ask for stop again just in case)
                 thrift_list = []
-                inputs_unique_set = set()
 
                 if inputType == 'binary':
-                    for arch in user_info.eosscontext.design_set.all():
-                        thrift_list.append(BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
-                        hashed_input = hash(tuple(json.loads(arch.inputs)))
-                        inputs_unique_set.add(hashed_input)
+                    for arch_id, arch_inputs, arch_outputs in dataset_cache.cache.get(user_info.eosscontext).designs():
+                        thrift_list.append(BinaryInputArchitecture(arch_id, arch_inputs, arch_outputs))
                     client.client.stopGABinaryInput(request.user.username)
                     while client.client.isGABinaryInputRunning():
                         time.sleep(0.1)
                     client.client.startGABinaryInput(problem, thrift_list, request.user.username)
 
                 elif inputType == 'discrete':
-                    for arch in user_info.eosscontext.design_set.all():
-                        thrift_list.append(DiscreteInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
-                        hashed_input = hash(tuple(json.loads(arch.inputs)))
-                        inputs_unique_set.add(hashed_input)
+                    for arch_id, arch_inputs, arch_outputs in dataset_cache.cache.get(user_info.eosscontext).designs():
+                        thrift_list.append(DiscreteInputArchitecture(arch_id, arch_inputs, arch_outputs))
                     client.client.stopGADiscreteInput(request.user.username)
                     while client.client.isGADiscreteInputRunning():
                         time.sleep(0.1)
@@ -381,13 +352,12 @@ class GetArchDetails(APIView):
             this_arch = None
             arch_id = int(request.data['arch_id'])
             problem = request.data['problem']
-            for arch in user_info.eosscontext.design_set.all():
-                if arch.id == arch_id:
-                    if problem in assignation_problems:
-                        this_arch = BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs))
-                    elif problem in partition_problems:
-                        this_arch = DiscreteInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs))
-                    break
+            arch = get_design(user_info.eosscontext, arch_id)
+            if arch is not None:
+                if problem in assignation_problems:
+                    this_arch = BinaryInputArchitecture(arch.id, arch.inputs.tolist(), arch.outputs.tolist())
+                elif problem in partition_problems:
+                    this_arch = DiscreteInputArchitecture(arch.id, arch.inputs.tolist(), arch.outputs.tolist())
 
             score_explanation = None
             cost_explanation = None
@@ -460,13 +430,12 @@ class GetSubobjectiveDetails(APIView):
             this_arch = None
             arch_id = int(request.data['arch_id'])
             problem = request.data['problem']
-            for arch in user_info.eosscontext.design_set.all():
-                if arch.id == arch_id:
-                    if problem in assignation_problems:
-                        this_arch = BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs))
-                    elif problem in partition_problems:
-                        this_arch = DiscreteInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs))
-                    break
+            arch = get_design(user_info.eosscontext, arch_id)
+            if arch is not None:
+                if problem in assignation_problems:
+                    this_arch = BinaryInputArchitecture(arch.id, arch.inputs.tolist(), arch.outputs.tolist())
+                elif problem in partition_problems:
+                    this_arch = DiscreteInputArchitecture(arch.id, arch.inputs.tolist(), arch.outputs.tolist())
 
             subobjective_explanation = None
             if problem in assignation_problems:
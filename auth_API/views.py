@@ -1,4 +1,3 @@
-import json
 import os
 
 from django.contrib.auth.forms import UserCreationForm
@@ -10,6 +9,7 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 
 from auth_API.helpers import get_user_information, get_or_create_user_information
+from daphne_API import dataset_cache
 from daphne_API.daphne_fields import daphne_fields
 from daphne_API.models import UserInformation
 
@@ -148,10 +148,10 @@ class CheckStatus(APIView):
             response['is_logged_in'] = True
             # Transform the database design data into a json for the frontend
             response['data'] = []
-            if len(user_info.eosscontext.design_set.all()) > 0:
-                for design in user_info.eosscontext.design_set.all():
-                    response['data'].append(
-                        {'id': design.id, 'inputs': json.loads(design.inputs), 'outputs': json.loads(design.outputs)})
+            dataset = dataset_cache.cache.get(user_info.eosscontext)
+            if len(dataset) > 0:
+                for design_id, inputs, outputs in dataset.designs():
+                    response['data'].append({'id': design_id, 'inputs': inputs, 'outputs': outputs})
                 response['modified_dataset'] = True
             else:
                 response['modified_dataset'] = False
@@ -0,0 +1 @@
+default_app_config = 'daphne_API.apps.DaphneApiConfig'
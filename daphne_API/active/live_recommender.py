@@ -1,4 +1,3 @@
-import json
 from string import Template
 
 from daphne_API.critic.critic import Critic
@@ -6,14 +5,14 @@ from daphne_API.models import Design, UserInformation
 
 
 def active_engineer_response(user_info: UserInformation, inputs):
-    modified_design = Design(inputs=json.dumps(inputs), outputs="")
+    modified_design = Design(inputs=inputs, outputs=[])
     critic = Critic(user_info)
     suggestion_list = critic.expert_critic(modified_design)
     return suggestion_list
 
 
 def active_historian_response(user_info: UserInformation, inputs):
-    modified_design = Design(inputs=json.dumps(inputs), outputs="")
+    modified_design = Design(inputs=inputs, outputs=[])
     critic = Critic(user_info)
     suggestion_list = critic.historian_critic(modified_design)
     return suggestion_list
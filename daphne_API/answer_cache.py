@@ -0,0 +1,122 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from daphne_API import problem_specific
+from daphne_API.models import AnswerDatasetVersion, UserInformation
+
+# Maximum number of answers kept in memory
+CACHE_SIZE = 1024
+
+# Number of seconds an answer is kept when its command type does not say otherwise
+DEFAULT_TTL = 3600
+
+
+def context_fingerprint(context: UserInformation, context_fields):
+    """ The values of the (dotted) context fields an answer depends on, e.g. eosscontext.problem """
+    values = []
+    for field in context_fields:
+        value = context
+        for attribute in field.split('.'):
+            value = getattr(value, attribute)
+        values.append(value)
+    return json.dumps(values, default=str)
+
+
+def problem_files_version(context: UserInformation):
+    """ Latest modification time of the files of the problem the VASSAR answers are computed from """
+    xls_path = problem_specific.get_xls_path(context.eosscontext.problem)
+    if xls_path is None:
+        return 0
+    try:
+        return max((entry.stat().st_mtime for entry in os.scandir(xls_path) if entry.is_file()), default=0)
+    except OSError:
+        return 0
+
+
+# Datasets read from files, whose answers also change when the files do
+FILE_VERSIONS = {
+    "vassar": problem_files_version
+}
+
+
+def dataset_version(dataset):
+    """ Version of the dataset in the database, bumped by any process changing it """
+    versions = AnswerDatasetVersion.objects.filter(name=dataset).values_list('version', flat=True)
+    return next(iter(versions), 0)
+
+
+def bump_dataset_version(dataset):
+    if AnswerDatasetVersion.objects.filter(name=dataset).update(version=F('version') + 1) == 0:
+        try:
+            with transaction.atomic():
+                AnswerDatasetVersion.objects.create(name=dataset, version=1)
+        except IntegrityError:
+            # Another process created it first
+            AnswerDatasetVersion.objects.filter(name=dataset).update(version=F('version') + 1)
+
+
+class AnswerCache:
+    """
+    LRU cache of the answers of deterministic command types, the ones declaring a "cache" section in their JSON:
+    { "dataset": <name>, "context": [<dotted context fields>], "ttl": <seconds> }.
+    Answers are keyed by command type, extracted parameters, the context fields and the version of their dataset.
+    Versions are kept in the database, so invalidating a dataset from any process (e.g. refresh_historian_aggregates)
+    makes every worker compute its answers again.
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._answers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, command_class, question_type, data, context: UserInformation, cache_info):
+        dataset = cache_info.get("dataset", command_class)
+        version = dataset_version(dataset)
+        if dataset in FILE_VERSIONS:
+            version = (version, FILE_VERSIONS[dataset](context))
+        return (command_class, question_type, dataset, version,
+                json.dumps(data, sort_keys=True, default=str),
+                context_fingerprint(context, cache_info.get("context", [])))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._answers.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._answers[key]
+                return None
+            self._answers.move_to_end(key)
+        return copy.deepcopy(entry[1])
+
+    def put(self, key, answers, cache_info):
+        expires_at = time.monotonic() + cache_info.get("ttl", DEFAULT_TTL)
+        with self._lock:
+            self._answers[key] = (expires_at, copy.deepcopy(answers))
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.size:
+                self._answers.popitem(last=False)
+
+    def invalidate(self, dataset=None):
+        """
+        Forget the answers computed from a dataset after it changes, in every process. Without a dataset, only clear
+        the answers kept by this process
+        """
+        if dataset is not None:
+            bump_dataset_version(dataset)
+        with self._lock:
+            if dataset is None:
+                self._answers.clear()
+            else:
+                for key in [key for key in self._answers if key[2] == dataset]:
+                    del self._answers[key]
+
+
+cache = AnswerCache()
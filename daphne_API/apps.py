@@ -0,0 +1,25 @@
+import threading
+
+from django.apps import AppConfig
+from django.core.signals import request_finished
+
+from daphne_API import database_pool
+from daphne_brain import startup
+
+
+def remove_database_sessions(sender, **kwargs):
+    database_pool.remove_sessions()
+
+
+class DaphneApiConfig(AppConfig):
+    name = 'daphne_API'
+
+    def ready(self):
+        # Give the SQLAlchemy connections used by a request back to their pools once it is done
+        request_finished.connect(remove_database_sessions, dispatch_uid="daphne_remove_database_sessions")
+        # Only warns, the table is filled by refresh_historian_aggregates. In the background, as it connects to the
+        # historian database
+        from daphne_API.historian.models import check_mission_measurements
+        threading.Thread(target=check_mission_measurements, daemon=True).start()
+        # spaCy, TensorFlow and the classifiers are loaded on first use, and report their own times then
+        startup.mark_ready()
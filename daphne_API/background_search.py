@@ -1,8 +1,7 @@
-import json
-
 from asgiref.sync import async_to_sync
 
-from daphne_API.diversifier import activate_diversifier
+from daphne_API import dataset_cache, design_encoding
+from daphne_API.design_helpers import count_added_designs
 from daphne_API.models import Design
 
 
@@ -16,22 +15,19 @@ def send_archs_back(channel_layer, channel_name, archs):
 
 def send_archs_from_queue_to_main_dataset(context):
     background_queue_qs = Design.objects.filter(activecontext_id__exact=context.eosscontext.activecontext.id)
-    arch_list = []
-    for design in background_queue_qs.all():
-        design.activecontext = None
-        design.eosscontext = context.eosscontext
-        design.save()
-        context.eosscontext.added_archs_count += 1
-        context.eosscontext.save()
-        arch_list.append({
-            'id': design.id,
-            'inputs': json.loads(design.inputs),
-            'outputs': json.loads(design.outputs),
-        })
-
-    if context.eosscontext.added_archs_count >= 5:
-        context.eosscontext.added_archs_count = 0
-        context.eosscontext.save()
-        activate_diversifier(context.eosscontext)
+    # Designs found again after being added to the dataset are dropped, they would break its unique input digests
+    background_queue_qs.filter(input_digest__in=Design.objects.filter(eosscontext_id__exact=context.eosscontext.id)
+                               .values('input_digest')).delete()
+    moved_designs = list(background_queue_qs.all())
+    Design.objects.filter(design_id__in=[design.design_id for design in moved_designs])\
+        .update(activecontext=None, eosscontext=context.eosscontext)
+    inputs = design_encoding.unpack_rows([design.packed_inputs for design in moved_designs]).tolist()
+    outputs = design_encoding.unpack_rows([design.packed_outputs for design in moved_designs]).tolist()
+    arch_list = [{'id': design.id, 'inputs': design_inputs, 'outputs': design_outputs}
+                 for design, design_inputs, design_outputs in zip(moved_designs, inputs, outputs)]
+
+    if len(moved_designs) > 0:
+        dataset_cache.cache.add(context.eosscontext, moved_designs)
+        count_added_designs(context.eosscontext, len(moved_designs))
 
     return arch_list
\ No newline at end of file
@@ -0,0 +1,286 @@
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from thrift.protocol import TBinaryProtocol
+from thrift.server import TServer
+from thrift.transport import TSocket, TTransport
+
+from auth_API.helpers import create_user_information
+from daphne_API import answer_cache, command_lists, command_processing, data_extractors, dataset_cache, latency
+from daphne_API.models import Design, UserInformation
+from daphne_brain.nlp_object import nlp
+from data_mining_API.interface import interface as DataMiningInterface
+from data_mining_API.interface.ttypes import Feature
+from VASSAR_API.thriftinterface import VASSARInterface
+from VASSAR_API.thriftinterface.ttypes import BinaryInputArchitecture, DiscreteInputArchitecture, \
+    ObjectiveSatisfaction
+
+BENCHMARK_USERNAME = 'daphne-benchmark'
+
+# Command lists whose templates are expanded into questions
+COMMAND_LISTS = {
+    'analyst': command_lists.analyst_commands,
+    'critic': command_lists.critic_commands,
+    'historian': command_lists.historian_commands
+}
+
+PARAMETER = re.compile(r'\$\{(\w+)\}')
+OPTIONAL_PART = re.compile(r'\[([^\[\]]*)\]')
+
+STUB_INSTRUMENTS = ['SMAP_RAD', 'SMAP_MWR', 'CMIS', 'VIIRS', 'BIOMASS']
+
+
+def entity_values(context: UserInformation, designs):
+    """ The real values each parameter of the command templates can take, sorted so the corpus is repeatable """
+    problem = context.eosscontext.problem
+    values = {
+        'measurement': command_lists.measurements_list(),
+        'space_agency': command_lists.agencies_list(),
+        'mission': command_lists.missions_list(),
+        'technology': command_lists.technologies_list(),
+        'year': [str(year) for year in range(1980, 2031)],
+        'design_id': ['D' + str(design.id) for design in designs],
+        'analyst_objective': data_extractors.vassar_objective_features(context),
+        'analyst_stakeholder': command_lists.analyst_stakeholder_list(problem),
+        'analyst_instrument': command_lists.analyst_instrument_list(problem),
+        'analyst_instrument_parameter': list(command_lists.analyst_instrument_parameter_list(problem)),
+        'analyst_measurement': command_lists.analyst_measurement_list(problem)
+    }
+    return {name: sorted(str(value).strip() for value in options) for name, options in values.items()}
+
+
+def expand_template(template, values, rng: random.Random):
+    # Optional parts of the template are kept half of the time
+    question = OPTIONAL_PART.sub(lambda match: match.group(1) if rng.random() < 0.5 else '', template)
+    # Years appear in ranges, so they are drawn in increasing order
+    years = sorted(rng.choice(values['year']) for _ in PARAMETER.findall(question))
+    years.reverse()
+    question = PARAMETER.sub(lambda match: years.pop() if match.group(1) == 'year'
+                             else rng.choice(values[match.group(1)]), question)
+    return re.sub(r' ([?.,])', r'\1', ' '.join(question.split()))
+
+
+def build_corpus(context: UserInformation, designs, size, seed=0, lists=None):
+    """ Expand the templates of command_lists with real entity values into a list of questions """
+    rng = random.Random(seed)
+    values = entity_values(context, designs)
+    templates = [(list_name, command_type, template)
+                 for list_name, command_list in sorted(COMMAND_LISTS.items()) if lists is None or list_name in lists
+                 for command_type, template in command_list]
+    corpus = []
+    for index in range(size):
+        list_name, command_type, template = templates[index % len(templates)]
+        corpus.append({
+            'list': list_name,
+            'command_type': command_type,
+            'question': expand_template(template, values, rng)
+        })
+    return corpus
+
+
+def check_database():
+    """ Refuse to touch any database but the one set aside for benchmarking in settings.BENCHMARK_DATABASE """
+    name = settings.DATABASES['default']['NAME']
+    benchmark_database = getattr(settings, 'BENCHMARK_DATABASE', None)
+    if benchmark_database is None or name != benchmark_database:
+        raise ImproperlyConfigured('The benchmark only runs against the ' + str(benchmark_database) +
+                                   ' database, but ' + str(name) + ' is selected')
+
+
+def prepare_context(problem, vassar_port, number_of_designs, seed=0):
+    """ A user of its own for the benchmark, always with the same designs so every run answers the same questions """
+    check_database()
+    user, created = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+    user_info = UserInformation.objects.filter(user__exact=user).first()
+    if user_info is None:
+        user_info = create_user_information(username=BENCHMARK_USERNAME)
+    eosscontext = user_info.eosscontext
+    eosscontext.problem = problem
+    eosscontext.vassar_port = vassar_port
+    eosscontext.save(update_fields=['problem', 'vassar_port'])
+    eosscontext.allowedcommand_set.all().delete()
+
+    rng = random.Random(seed)
+    input_length = 60 if problem.startswith('SMAP') or problem == 'ClimateCentric' else 20
+    eosscontext.design_set.all().delete()
+    # Keyed by input digest, as a dataset can't have two designs with the same inputs
+    designs = OrderedDict()
+    while len(designs) < number_of_designs:
+        design = Design(eosscontext=eosscontext, id=len(designs),
+                        inputs=[rng.random() < 0.3 for _ in range(input_length)],
+                        outputs=[rng.random(), rng.uniform(1000, 10000)])
+        designs.setdefault(design.input_digest, design)
+    designs = list(designs.values())
+    Design.objects.bulk_create(designs)
+    dataset_cache.cache.replace(eosscontext, designs)
+    eosscontext.last_arch_id = number_of_designs
+    eosscontext.save(update_fields=['last_arch_id'])
+    return user_info, list(eosscontext.design_set.all())
+
+
+class StubVASSARHandler:
+    """ Answers the VASSAR calls made by the skills with fixed values, after waiting delay seconds """
+
+    def __init__(self, delay=0.):
+        self.delay = delay
+
+    def wait(self):
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+    def ping(self):
+        pass
+
+    def getObjectiveList(self, problem):
+        self.wait()
+        return data_extractors.vassar_objective_features(None)
+
+    def getInstrumentsForObjective(self, problem, objective):
+        self.wait()
+        return STUB_INSTRUMENTS[:3]
+
+    def getInstrumentsForPanel(self, problem, panel):
+        self.wait()
+        return STUB_INSTRUMENTS[2:]
+
+    def getCritiqueBinaryInputArch(self, problem, inputs):
+        self.wait()
+        return ['This design has too many instruments in a single orbit.']
+
+    def getCritiqueDiscreteInputArch(self, problem, inputs):
+        return self.getCritiqueBinaryInputArch(problem, inputs)
+
+    def getArchitectureScoreExplanation(self, problem, arch):
+        self.wait()
+        return [ObjectiveSatisfaction(panel, 0.5, 0.125)
+                for panel in ['ATM', 'OCE', 'TER', 'WEA', 'CLI', 'ECO', 'WAT', 'HEA']]
+
+    def getPanelScoreExplanation(self, problem, arch, panel):
+        self.wait()
+        return [ObjectiveSatisfaction(panel + str(index), 0.5, 0.2) for index in range(1, 6)]
+
+    def getObjectiveScoreExplanation(self, problem, arch, objective):
+        self.wait()
+        return [ObjectiveSatisfaction(objective + '-' + str(index), 0.5, 0.25) for index in range(1, 5)]
+
+    def runLocalSearchBinaryInput(self, problem, inputs):
+        self.wait()
+        return [BinaryInputArchitecture(0, inputs, [0.5, 5000.])]
+
+    def runLocalSearchDiscreteInput(self, problem, inputs):
+        self.wait()
+        return [DiscreteInputArchitecture(0, inputs, [0.5, 5000.])]
+
+
+class StubDataMiningHandler:
+    """ Answers the data mining calls made by the skills with a fixed driving feature, after waiting delay seconds """
+
+    def __init__(self, delay=0.):
+        self.delay = delay
+
+    def ping(self):
+        pass
+
+    def runAutomatedLocalSearchBinary(self, problem, behavioral, non_behavioral, all_archs, supp, conf, lift):
+        if self.delay > 0:
+            time.sleep(self.delay)
+        return [Feature(0, 'present', '{present[;1;]}', [0.5, 0.5, 1.2, 0.8], 1)]
+
+    def runAutomatedLocalSearchDiscrete(self, problem, behavioral, non_behavioral, all_archs, supp, conf, lift):
+        return self.runAutomatedLocalSearchBinary(problem, behavioral, non_behavioral, all_archs, supp, conf, lift)
+
+
+def start_stub_server(processor, port):
+    transport = TSocket.TServerSocket(host='localhost', port=port)
+    server = TServer.TThreadedServer(processor, transport, TTransport.TBufferedTransportFactory(),
+                                     TBinaryProtocol.TBinaryProtocolFactory(), daemon=True)
+    thread = threading.Thread(target=server.serve)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def start_stub_servers(vassar_port, data_mining_port, delay=0.):
+    return [start_stub_server(VASSARInterface.Processor(StubVASSARHandler(delay)), vassar_port),
+            start_stub_server(DataMiningInterface.Processor(StubDataMiningHandler(delay)), data_mining_port)]
+
+
+def percentiles(samples):
+    """ Exact latency percentiles of a list of milliseconds, using the nearest rank """
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": ordered[-1]
+    }
+
+
+def answer_question(question, context: UserInformation):
+    """ Same steps as the Command endpoint, without saving the answers """
+    with latency.span("nlp"):
+        processed_command = nlp(question.strip().lower())
+    with latency.span("classify", "general"):
+        command_types = command_processing.classify_command(processed_command)
+    command_processing.run_commands(processed_command, command_types, context, [])
+    return [command_processing.command_options[command_type] for command_type in command_types]
+
+
+def run_benchmark(corpus, context: UserInformation, warmup=0):
+    """
+    Answer every question of the corpus, one after the other.
+    :return: The throughput, exact latency percentiles per module and the histograms of each stage of the pipeline
+    """
+    for entry in corpus[:warmup]:
+        answer_question(entry['question'], context)
+    # Otherwise the warmup questions would then be answered from the answer cache
+    answer_cache.cache.invalidate()
+    latency.stats.reset()
+
+    samples_per_module = {}
+    all_samples = []
+    start = time.monotonic()
+    for entry in corpus:
+        question_start = time.monotonic()
+        modules = answer_question(entry['question'], context)
+        milliseconds = (time.monotonic() - question_start) * 1000
+        samples_per_module.setdefault('+'.join(modules), []).append(milliseconds)
+        all_samples.append(milliseconds)
+    elapsed = time.monotonic() - start
+
+    return {
+        "questions": len(corpus),
+        "elapsed": elapsed,
+        "throughput": len(corpus) / elapsed if elapsed > 0 else 0.,
+        "latency": percentiles(all_samples) if len(all_samples) > 0 else None,
+        "modules": {module: percentiles(samples) for module, samples in sorted(samples_per_module.items())},
+        "stages": latency.stats.report()["stages"]
+    }
+
+
+def compare(results, baseline):
+    """ Relative change of the throughput and of the latency percentiles of each module against a baseline """
+    def change(new, old):
+        return (new - old) / old if old else None
+
+    comparison = {
+        "throughput": change(results["throughput"], baseline["throughput"]),
+        "modules": {}
+    }
+    for module, stats in results["modules"].items():
+        if module in baseline["modules"]:
+            comparison["modules"][module] = {key: change(stats[key], baseline["modules"][module][key])
+                                             for key in ["p50", "p95", "p99"]}
+    return comparison
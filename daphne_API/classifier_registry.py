@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from daphne_API.numpy_classifier import ARTIFACT_NAME, NumpyClassifier
+from daphne_brain import startup
+
+logger = logging.getLogger('debugging')
+
+MODELS_PATH = "./daphne_API/models/"
+
+# Maximum number of questions fed to a classifier in a single run
+BATCH_SIZE = 512
+
+
+_tensorflow = None
+
+
+def import_tensorflow():
+    """ TensorFlow is only imported once a classifier is needed, so workers that never classify do not pay for it """
+    global _tensorflow
+    if _tensorflow is None:
+        with startup.timed("tensorflow_import"):
+            import tensorflow as tf
+            from tensorflow.contrib import learn
+        _tensorflow = (tf, learn)
+    return _tensorflow
+
+
+class LoadedClassifier:
+    """ A question classifier restored from its checkpoint, with its session and tensors ready to be evaluated """
+
+    def __init__(self, module_name, models_path):
+        tf, learn = import_tensorflow()
+        self.module_name = module_name
+        module_path = os.path.join(models_path, module_name)
+
+        # Map data into vocabulary
+        self.vocab_processor = learn.preprocessing.VocabularyProcessor.restore(os.path.join(module_path, "vocab"))
+
+        self.checkpoint_file = tf.train.latest_checkpoint(module_path)
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            session_conf = tf.ConfigProto(allow_soft_placement=True, log_device_placement=False)
+            self.session = tf.Session(config=session_conf)
+            with self.session.as_default():
+                # Load the saved meta graph and restore variables
+                saver = tf.train.import_meta_graph("{}.meta".format(self.checkpoint_file))
+                saver.restore(self.session, self.checkpoint_file)
+
+            # Get the placeholders from the graph by name
+            self.input_x = self.graph.get_operation_by_name("input_x").outputs[0]
+            self.dropout_keep_prob = self.graph.get_operation_by_name("dropout_keep_prob").outputs[0]
+
+            # Tensors we want to evaluate
+            self.logits_tensor = self.graph.get_operation_by_name("output/logits").outputs[0]
+
+        # No more ops will be added, which also makes concurrent runs from several threads safe
+        self.graph.finalize()
+
+    def logits(self, cleaned_questions):
+        x_test = np.array(list(self.vocab_processor.transform(cleaned_questions)))
+        if len(x_test) <= BATCH_SIZE:
+            return self.session.run(self.logits_tensor, {self.input_x: x_test, self.dropout_keep_prob: 1.0})
+        batches = [self.session.run(self.logits_tensor, {self.input_x: x_test[i:i + BATCH_SIZE],
+                                                         self.dropout_keep_prob: 1.0})
+                   for i in range(0, len(x_test), BATCH_SIZE)]
+        return np.concatenate(batches)
+
+
+class ClassifierRegistry:
+    """
+    Process-wide cache of the question classifiers. Each module is restored once and reused by every request, and
+    reloaded when a newer checkpoint is written under daphne_API/models/<module>/.
+    With CLASSIFIER_ENGINE = 'numpy', the classifiers exported by manage.py export_classifiers are run with NumPy and
+    TensorFlow is only imported for the modules without an up to date export.
+    """
+
+    def __init__(self, models_path=MODELS_PATH):
+        self.models_path = models_path
+        self._classifiers = {}
+        self._lock = threading.Lock()
+
+    def _mtime(self, module_name, filename):
+        try:
+            return os.stat(os.path.join(self.models_path, module_name, filename)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _version(self, module_name):
+        """ Which engine runs the classifier of a module, and the modification time of the files it is loaded from """
+        # The saver rewrites the checkpoint index file every time it writes a new checkpoint
+        checkpoint_mtime = self._mtime(module_name, "checkpoint")
+        if settings.CLASSIFIER_ENGINE == 'numpy':
+            artifact_mtime = self._mtime(module_name, ARTIFACT_NAME)
+            if artifact_mtime is not None and (checkpoint_mtime is None or artifact_mtime >= checkpoint_mtime):
+                return "numpy", artifact_mtime
+        return "tensorflow", checkpoint_mtime
+
+    def get(self, module_name):
+        version = self._version(module_name)
+        classifier = self._classifiers.get(module_name)
+        if classifier is not None and classifier.version == version:
+            return classifier
+
+        with self._lock:
+            # Another thread might have loaded it while we were waiting
+            classifier = self._classifiers.get(module_name)
+            if classifier is None or classifier.version != version:
+                logger.info("Loading the " + module_name + " classifier with " + version[0])
+                # The previous classifier is not closed here as other threads might still be using it, its session
+                # gets closed when it is garbage collected
+                with startup.timed("classifier_load_" + module_name):
+                    if version[0] == "numpy":
+                        classifier = NumpyClassifier(module_name,
+                                                     os.path.join(self.models_path, module_name, ARTIFACT_NAME))
+                    else:
+                        if settings.CLASSIFIER_ENGINE == 'numpy':
+                            logger.warning("The " + module_name + " classifier has no up to date export, run "
+                                           "manage.py export_classifiers to classify without TensorFlow")
+                        classifier = LoadedClassifier(module_name, self.models_path)
+                classifier.version = version
+                self._classifiers[module_name] = classifier
+        return classifier
+
+    def load_tensorflow(self, module_name):
+        """ The classifier of a module restored from its checkpoint, whatever the engine, for exporting it """
+        return LoadedClassifier(module_name, self.models_path)
+
+    def logits(self, module_name, cleaned_questions):
+        return self.get(module_name).logits(cleaned_questions)
+
+    def warm_up(self, module_names):
+        for module_name in module_names:
+            self.get(module_name)
+
+
+registry = ClassifierRegistry()
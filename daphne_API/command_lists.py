@@ -1,9 +1,9 @@
 from django.conf import settings
-from sqlalchemy.orm import sessionmaker
 
 if 'EOSS' in settings.ACTIVE_MODULES:
     import daphne_API.historian.models as models
     import daphne_API.problem_specific as problem_specific
+    from daphne_API.gazetteer import gazetteer
 
 
 general_commands = [
@@ -74,32 +74,21 @@ def historian_commands_list(restricted_list=None):
 
 
 def measurements_list():
-    engine = models.db_connect()
-    session = sessionmaker(bind=engine)()
-    measurements = [measurement.name.strip() for measurement in session.query(models.Measurement).all()]
-    return measurements
+    return list(gazetteer.names('measurements'))
 
 
 def missions_list():
-    engine = models.db_connect()
-    session = sessionmaker(bind=engine)()
-    missions = [mission.name.strip() for mission in session.query(models.Mission).all()]
-    return missions
+    return list(gazetteer.names('missions'))
 
 
 def technologies_list():
-    engine = models.db_connect()
-    session = sessionmaker(bind=engine)()
     technologies = [technology for technology in models.technologies]
-    technologies = technologies + [type.name.strip() for type in session.query(models.InstrumentType).all()]
+    technologies = technologies + gazetteer.names('instrument_types')
     return technologies
 
 
 def agencies_list():
-    engine = models.db_connect()
-    session = sessionmaker(bind=engine)()
-    agencies = [agency.name.strip() for agency in session.query(models.Agency).all()]
-    return agencies
+    return list(gazetteer.names('agencies'))
 
 
 def objectives_list(vassar_client, problem):
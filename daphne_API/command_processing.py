@@ -1,52 +1,78 @@
 import json
-import os
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-import numpy as np
-import tensorflow as tf
-from tensorflow.contrib import learn
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connection
 
-from daphne_API import data_helpers, qa_pipeline
+from daphne_API import answer_cache, classifier_registry, data_helpers, database_pool, latency, qa_pipeline
 from daphne_API.errors import ParameterMissingError
-from daphne_API.models import EOSSContext, UserInformation
+from daphne_API.models import EOSSContext, UserInformation, Answer, AllowedCommand
+from daphne_brain.nlp_object import nlp
+
+# Skill assigned to each output of the general classifier
+command_options = ['iFEED', 'VASSAR', 'Critic', 'Historian', 'EDL']
+condition_names = ['ifeed', 'analyst', 'critic', 'historian', 'edl']
+
+logger = logging.getLogger('debugging')
+
+# Shared by all the requests of the worker, so the number of skills running at once stays bounded
+skill_executor = ThreadPoolExecutor(max_workers=settings.SKILL_WORKERS)
+# A single thread, so the answers of consecutive commands are saved in order
+answer_writer = ThreadPoolExecutor(max_workers=1)
 
 
 def classify_command(command):
     cleaned_command = data_helpers.clean_str(command)
 
-    # Map data into vocabulary
-    vocab_path = os.path.join("./daphne_API/models/general/vocab")
-    vocab_processor = learn.preprocessing.VocabularyProcessor.restore(vocab_path)
-    x_test = np.array(list(vocab_processor.transform([cleaned_command])))
-
-    print("\nEvaluating...\n")
-
-    # Evaluation
-    # ==================================================
-    checkpoint_file = tf.train.latest_checkpoint("./daphne_API/models/general/")
-    graph = tf.Graph()
-    with graph.as_default():
-        session_conf = tf.ConfigProto(allow_soft_placement=True, log_device_placement=False)
-        sess = tf.Session(config=session_conf)
-        with sess.as_default():
-            # Load the saved meta graph and restore variables
-            saver = tf.train.import_meta_graph("{}.meta".format(checkpoint_file))
-            saver.restore(sess, checkpoint_file)
-
-            # Get the placeholders from the graph by name
-            input_x = graph.get_operation_by_name("input_x").outputs[0]
-            # input_y = graph.get_operation_by_name("input_y").outputs[0]
-            dropout_keep_prob = graph.get_operation_by_name("dropout_keep_prob").outputs[0]
-
-            # Tensors we want to evaluate
-            logits = graph.get_operation_by_name("output/logits").outputs[0]
-
-            # get the prediction
-            result_logits = sess.run(logits, {input_x: x_test, dropout_keep_prob: 1.0})
-            prediction = data_helpers.get_label_using_logits(result_logits, top_number=1)
+    # Evaluate the command with the already loaded general classifier
+    result_logits = classifier_registry.registry.logits("general", [cleaned_command])
+    prediction = data_helpers.get_label_using_logits(result_logits, top_number=1)
 
     return prediction[0]
 
 
+def classify_batch(commands, top_number=1):
+    """
+    Classify a batch of commands with the general classifier and then with the classifier of the skill each one was
+    assigned to. Every classifier runs once for the whole batch.
+    :param commands: A list of commands already processed with spaCy
+    :param top_number: The number of labels (and their logits) to return for each classification
+    :return: A list with a dictionary for each command, with its general and skill labels
+    """
+    def top_labels(logits, labels):
+        predictions = data_helpers.get_label_using_logits(logits, top_number=top_number)
+        return [[{"label": labels[index], "logit": float(row_logits[index])} for index in prediction]
+                for prediction, row_logits in zip(predictions, logits)]
+
+    cleaned_commands = [data_helpers.clean_str(command) for command in commands]
+    if len(cleaned_commands) == 0:
+        return []
+
+    general_logits = classifier_registry.registry.logits("general", cleaned_commands)
+    general_labels = top_labels(general_logits, command_options)
+    results = [{"command": command.text, "general": labels, "skill": None}
+               for command, labels in zip(commands, general_labels)]
+
+    # Group the commands by the skill that would answer them
+    commands_per_skill = {}
+    for index, labels in enumerate(general_labels):
+        commands_per_skill.setdefault(labels[0]["label"], []).append(index)
+
+    for command_class, indices in commands_per_skill.items():
+        skill_logits = classifier_registry.registry.logits(command_class,
+                                                           [cleaned_commands[index] for index in indices])
+        skill_labels = top_labels(skill_logits, qa_pipeline.get_named_labels(command_class))
+        for index, labels in zip(indices, skill_labels):
+            results[index]["skill"] = labels
+
+    return results
+
+
 def error_answers(missing_param):
     return {
         'voice_answer': 'I can\'t answer this question because I\'m missing a ' + missing_param + ' parameter.',
@@ -55,10 +81,50 @@ def error_answers(missing_param):
     }
 
 
-def not_allowed_condition(context: UserInformation, command_class, command_type):
-    if len(context.eosscontext.allowedcommand_set.all()) == 0:
+def timeout_answers(command_class):
+    return {
+        'voice_answer': 'The ' + command_class + ' skill took too long to answer this question.',
+        'visual_answer_type': 'text',
+        'visual_answer': 'The ' + command_class + ' skill took too long to answer this question.'
+    }
+
+
+def update_allowed_commands(eosscontext: EOSSContext, requested_commands):
+    """
+    Make the allowed commands of the context match the ones sent with the command, only writing the differences.
+    :param requested_commands: A dictionary from command type to a list of command numbers (empty if not sent)
+    :return: The allowed commands of the context
+    """
+    requested = []
+    for command_type, command_list in requested_commands.items():
+        for command_number in command_list:
+            if (command_type, int(command_number)) not in requested:
+                requested.append((command_type, int(command_number)))
+
+    kept_commands = {}
+    stale_ids = []
+    for allowed_command in eosscontext.allowedcommand_set.all():
+        key = (allowed_command.command_type, allowed_command.command_descriptor)
+        if key in requested and key not in kept_commands:
+            kept_commands[key] = allowed_command
+        else:
+            stale_ids.append(allowed_command.id)
+    new_commands = [AllowedCommand(eosscontext=eosscontext, command_type=command_type, command_descriptor=command_number)
+                    for command_type, command_number in requested if (command_type, command_number) not in kept_commands]
+
+    if len(stale_ids) > 0:
+        AllowedCommand.objects.filter(id__in=stale_ids).delete()
+    if len(new_commands) > 0:
+        AllowedCommand.objects.bulk_create(new_commands)
+    return list(kept_commands.values()) + new_commands
+
+
+def not_allowed_condition(context: UserInformation, command_class, command_type, allowed_commands=None):
+    if allowed_commands is None:
+        allowed_commands = list(context.eosscontext.allowedcommand_set.all())
+    if len(allowed_commands) == 0:
         return False
-    for allowed_command in context.eosscontext.allowedcommand_set.all():
+    for allowed_command in allowed_commands:
         if command_class == allowed_command.command_type and command_type == allowed_command.command_descriptor:
             return False
     return True
@@ -72,38 +138,184 @@ def not_allowed_answers():
     }
 
 
-def command(processed_command, command_class, condition_name, context: UserInformation):
-    # Classify the question, obtaining a question type
-    question_type = qa_pipeline.classify(processed_command, command_class)
-    print(question_type)
-    if not_allowed_condition(context, condition_name, str(question_type)):
-        return not_allowed_answers()
-    # Load list of required and optional parameters from question, query and response format for question type
-    information = qa_pipeline.load_type_info(question_type, command_class)
-    # Extract required and optional parameters
+def command(processed_command, command_class, condition_name, context: UserInformation, allowed_commands=None):
+    with latency.trace(processed_command.text, command_class) as trace:
+        # Classify the question, obtaining a question type
+        with trace.span("classify"):
+            question_type = qa_pipeline.classify(processed_command, command_class)
+        trace.command_type = question_type
+        if not_allowed_condition(context, condition_name, str(question_type), allowed_commands):
+            return not_allowed_answers()
+        # Load list of required and optional parameters from question, query and response format for question type
+        with trace.span("load_type_info"):
+            information = qa_pipeline.load_type_info(question_type, command_class)
+        # Extract required and optional parameters
+        try:
+            with trace.span("extract_data"):
+                data = qa_pipeline.extract_data(processed_command, information["params"], context)
+        except ParameterMissingError as error:
+            print(error)
+            return error_answers(error.missing_param)
+        # Deterministic types give the same answer for the same parameters and context
+        cache_key = None
+        if information["cache"] is not None:
+            with trace.span("answer_cache"):
+                cache_key = answer_cache.cache.make_key(command_class, question_type, data, context,
+                                                        information["cache"])
+                cached_answers = answer_cache.cache.get(cache_key)
+            if cached_answers is not None:
+                return cached_answers
+        # Add extra parameters to data
+        with trace.span("augment_data"):
+            data = qa_pipeline.augment_data(data, context)
+        # Query the database
+        if information["type"] == "db_query":
+            with trace.span("query"):
+                results = qa_pipeline.query(information["query"], data, information["plan"])
+        elif information["type"] == "run_function":
+            with trace.span("run_function"):
+                results = qa_pipeline.run_function(information["function"], data, context, information["plan"])
+        else:
+            results = None
+        # Construct the response from the database query and the response format
+        with trace.span("build_answers"):
+            answers = qa_pipeline.build_answers(information["voice_response"], information["visual_response"], results,
+                                                data, information["templates"])
+        if cache_key is not None:
+            answer_cache.cache.put(cache_key, answers, information["cache"])
+
+        # Return the answer to the client
+        return answers
+
+
+def run_skill(processed_command, command_type, context: UserInformation, allowed_commands=None):
     try:
-        data = qa_pipeline.extract_data(processed_command, information["params"], context)
-    except ParameterMissingError as error:
-        print(error)
-        return error_answers(error.missing_param)
-    # Add extra parameters to data
-    data = qa_pipeline.augment_data(data, context)
-    # Query the database
-    if information["type"] == "db_query":
-        results = qa_pipeline.query(information["query"], data)
-    elif information["type"] == "run_function":
-        results = qa_pipeline.run_function(information["function"], data, context)
-    else:
-        results = None
-    # Construct the response from the database query and the response format
-    answers = qa_pipeline.build_answers(information["voice_response"], information["visual_response"], results, data)
-
-    # Return the answer to the client
+        return command(processed_command, command_options[command_type], condition_names[command_type], context,
+                       allowed_commands)
+    finally:
+        # Django only closes the connections of the request thread, so the ones of the pool threads are closed here
+        connection.close()
+        database_pool.remove_sessions()
+
+
+def submit_skills(processed_command, command_types, context: UserInformation, allowed_commands=None):
+    return [skill_executor.submit(run_skill, processed_command, command_type, context, allowed_commands)
+            for command_type in command_types]
+
+
+def completed_answers(command_types, futures, start):
+    """
+    Wait for the skills answering a command, in the order they finish.
+    :return: A generator of (index in command_types, answer). A skill that goes over its timeout gets a timeout answer
+    instead (it keeps running in the background until it finishes).
+    """
+    deadlines = {index: start + settings.SKILL_TIMEOUTS.get(command_options[command_type], 30)
+                 for index, command_type in enumerate(command_types)}
+    pending = {future: index for index, future in enumerate(futures)}
+    while len(pending) > 0:
+        remaining = min(deadlines[index] for index in pending.values()) - time.monotonic()
+        done, not_done = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+        for future in not_done:
+            index = pending[future]
+            if deadlines[index] <= time.monotonic():
+                command_class = command_options[command_types[index]]
+                logger.warning("The " + command_class + " skill timed out")
+                del pending[future]
+                yield index, timeout_answers(command_class)
+
+
+def run_commands(processed_command, command_types, context: UserInformation, allowed_commands=None):
+    """
+    Answer the command with every skill the general classifier chose, all of them at the same time.
+    :return: The answers of the skills, in the same order as command_types
+    """
+    start = time.monotonic()
+    futures = submit_skills(processed_command, command_types, context, allowed_commands)
+    answers = [None] * len(command_types)
+    for index, answer in completed_answers(command_types, futures, start):
+        answers[index] = answer
     return answers
 
 
-def think_response(context: UserInformation):
+def send_command_event(channel_name, event_type, command_id, **fields):
+    event = {'type': event_type, 'command_id': command_id}
+    event.update(fields)
+    async_to_sync(get_channel_layer().send)(channel_name, event)
+
+
+def stream_commands(channel_name, command_id, command_text, context: UserInformation, requested_commands,
+                    cancelled: threading.Event):
+    """
+    Answer a command received through the websocket, sending an event to the channel of the user at each step:
+    command.classified with the skills that will answer it, command.answer with the answer of each skill as soon as
+    it is ready, and command.finished with the final response. Nothing else is sent once cancelled is set.
+    """
+    try:
+        start = time.monotonic()
+        with latency.span("nlp"):
+            processed_command = nlp(command_text.strip().lower())
+        with latency.span("classify", "general"):
+            command_types = classify_command(processed_command)
+        if cancelled.is_set():
+            return
+        send_command_event(channel_name, 'command.classified', command_id,
+                           skills=[command_options[command_type] for command_type in command_types])
+
+        allowed_commands = update_allowed_commands(context.eosscontext, requested_commands)
+        futures = submit_skills(processed_command, command_types, context, allowed_commands)
+        answers = [None] * len(command_types)
+        for index, answer in completed_answers(command_types, futures, start):
+            if cancelled.is_set():
+                # Skills that have not started yet are dropped, the running ones finish in the background
+                for future in futures:
+                    future.cancel()
+                return
+            answers[index] = answer
+            send_command_event(channel_name, 'command.answer', command_id,
+                               skill=command_options[command_types[index]], answer=answer)
+
+        save_answers(context.eosscontext, answers)
+        send_command_event(channel_name, 'command.finished', command_id, response=think_response(context, answers))
+    except Exception:
+        logger.exception("Could not answer the command " + command_text)
+        if not cancelled.is_set():
+            send_command_event(channel_name, 'command.error', command_id,
+                               message='There was an error while answering this question.')
+    finally:
+        connection.close()
+        database_pool.remove_sessions()
+
+
+def store_answers(eosscontext: EOSSContext, answers):
+    try:
+        Answer.objects.filter(eosscontext__exact=eosscontext).delete()
+        Answer.objects.bulk_create([Answer(eosscontext=eosscontext,
+                                           voice_answer=answer["voice_answer"],
+                                           visual_answer_type=json.dumps(answer["visual_answer_type"]),
+                                           visual_answer=json.dumps(answer["visual_answer"]))
+                                    for answer in answers])
+    except Exception:
+        logger.exception("Could not save the answers")
+    finally:
+        connection.close()
+
+
+def save_answers(eosscontext: EOSSContext, answers):
+    """ Save the answers in the background if PERSIST_ANSWERS is set, the response does not wait for them """
+    if settings.PERSIST_ANSWERS:
+        answer_writer.submit(store_answers, eosscontext, answers)
+
+
+def think_response(context: UserInformation, answers=None):
     # TODO: Make this intelligent, e.g. hook this to a rule based engine
+    if answers is not None:
+        return {
+            "voice_answer": answers[0]["voice_answer"],
+            "visual_answer_type": answers[0]["visual_answer_type"],
+            "visual_answer": answers[0]["visual_answer"]
+        }
     db_answer = context.eosscontext.answer_set.all()[:1].get()
     frontend_answer = {
         "voice_answer": db_answer.voice_answer,
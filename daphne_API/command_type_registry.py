@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import threading
+import time
+from string import Template
+
+from daphne_API import query_plans
+
+logger = logging.getLogger('debugging')
+
+COMMAND_TYPES_PATH = "./daphne_API/command_types/"
+
+# Minimum number of seconds between two checks of the JSON files on disk
+CHECK_INTERVAL = 5
+
+
+class TemplateCache(dict):
+    """ Maps a template string to its compiled Template, compiling it the first time it is requested """
+
+    def __missing__(self, template_string):
+        template = Template(template_string)
+        self[template_string] = template
+        return template
+
+    def add_all(self, element):
+        """ Compile every string found inside a (possibly nested) JSON element """
+        if isinstance(element, str):
+            self[element]
+        elif isinstance(element, dict):
+            for value in element.values():
+                self.add_all(value)
+        elif isinstance(element, list):
+            for value in element:
+                self.add_all(value)
+
+
+class CommandType:
+    """ A command type as described by its JSON file, with all of its templates already compiled """
+
+    def __init__(self, module_name, type_id, label_index, type_info):
+        self.module_name = module_name
+        self.type_id = type_id
+        self.label_index = label_index
+
+        self.information = {
+            "type": type_info["type"],
+            "params": type_info["params"],
+            "voice_response": type_info["voice_response"],
+            "visual_response": type_info["visual_response"],
+            # Only set for deterministic types, whose answers can be reused (see answer_cache)
+            "cache": type_info.get("cache")
+        }
+        if type_info["type"] == "db_query":
+            self.information["query"] = type_info["query"]
+        elif type_info["type"] == "run_function":
+            self.information["function"] = type_info["function"]
+
+        templates = TemplateCache()
+        templates.add_all(type_info.get("query"))
+        templates.add_all(type_info.get("function"))
+        templates.add_all(type_info["voice_response"])
+        templates.add_all(type_info["visual_response"])
+        self.information["templates"] = templates
+
+        # Queries and function calls compiled once, with the extracted values passed as parameters
+        self.information["plan"] = query_plans.compile_plan(type_info)
+
+
+class ModuleCommandTypes:
+    """ All the command types of a module, in the same order as the outputs of its classifier """
+
+    def __init__(self, module_path, module_name):
+        self.signature = module_signature(module_path)
+        self.named_labels = []
+        self.command_types = {}
+        for label_index, (filename, mtime) in enumerate(self.signature):
+            type_id = int(filename.split('.', 1)[0])
+            # Every file takes a classifier output, even the placeholders for command types not written yet
+            self.named_labels.append(type_id)
+            try:
+                with open(os.path.join(module_path, filename), 'r') as file:
+                    type_info = json.load(file)
+            except ValueError:
+                logger.warning("Command type " + module_name + "/" + filename + " has no valid definition")
+                continue
+            self.command_types[type_id] = CommandType(module_name, type_id, label_index, type_info)
+        self.checked_at = time.monotonic()
+
+
+def module_signature(module_path):
+    return tuple((filename, os.stat(os.path.join(module_path, filename)).st_mtime)
+                 for filename in sorted(os.listdir(module_path)))
+
+
+class CommandTypeRegistry:
+    """
+    In-memory copy of every command type under daphne_API/command_types/<module>/<id>.json. A module is reloaded when
+    any of its files is added, removed or modified, which is checked at most every CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self, command_types_path=COMMAND_TYPES_PATH):
+        self.command_types_path = command_types_path
+        self._modules = {}
+        self._lock = threading.Lock()
+
+    def load_all(self):
+        for module_name in sorted(os.listdir(self.command_types_path)):
+            if os.path.isdir(os.path.join(self.command_types_path, module_name)):
+                self.get_module(module_name)
+
+    def get_module(self, module_name):
+        module = self._modules.get(module_name)
+        if module is not None and time.monotonic() - module.checked_at < CHECK_INTERVAL:
+            return module
+
+        with self._lock:
+            module_path = os.path.join(self.command_types_path, module_name)
+            module = self._modules.get(module_name)
+            if module is None or module.signature != module_signature(module_path):
+                module = ModuleCommandTypes(module_path, module_name)
+                self._modules[module_name] = module
+            else:
+                module.checked_at = time.monotonic()
+        return module
+
+    def get(self, module_name, type_id):
+        command_types = self.get_module(module_name).command_types
+        if int(type_id) not in command_types:
+            raise ValueError("Command type " + str(type_id) + " of " + module_name + " is not defined")
+        return command_types[int(type_id)]
+
+    def named_labels(self, module_name):
+        return self.get_module(module_name).named_labels
+
+    def invalidate(self, module_name=None):
+        with self._lock:
+            if module_name is None:
+                self._modules.clear()
+            else:
+                self._modules.pop(module_name, None)
+
+
+registry = CommandTypeRegistry()
+registry.load_all()
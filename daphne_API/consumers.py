@@ -1,5 +1,7 @@
 import hashlib
 import json
+import threading
+import uuid
 
 import pika
 from channels.generic.websocket import JsonWebsocketConsumer
@@ -7,6 +9,8 @@ import schedule
 from auth_API.helpers import get_user_information
 from django.conf import settings
 
+from daphne_API import command_processing
+
 if 'EOSS' in settings.ACTIVE_MODULES:
     from daphne_API.active import live_recommender
 
@@ -15,6 +19,9 @@ class DaphneConsumer(JsonWebsocketConsumer):
     scheduler = schedule.Scheduler()
     sched_stopper = None
     kill_event = None
+    # Question being answered through the command message, and the event that stops sending its answers
+    command_id = None
+    command_cancelled = None
 
     ##### WebSocket event handlers
     def connect(self):
@@ -46,9 +53,13 @@ class DaphneConsumer(JsonWebsocketConsumer):
         # Update context to SQL one
         if content.get('msg_type') == 'context_add':
             for subcontext_name, subcontext in content.get('new_context').items():
+                context_object = getattr(user_info, subcontext_name)
                 for key, value in subcontext.items():
-                    setattr(getattr(user_info, subcontext_name), key, value)
-                getattr(user_info, subcontext_name).save()
+                    setattr(context_object, key, value)
+                # Only the fields received, the counters of the context may have changed since it was read
+                fields = [field.name for field in context_object._meta.concrete_fields
+                          if field.name in subcontext and not field.primary_key]
+                context_object.save(update_fields=fields)
             user_info.save()
         elif content.get('msg_type') == 'active_engineer':
             if user_info.eosscontext.activecontext.show_arch_suggestions:
@@ -87,6 +98,19 @@ class DaphneConsumer(JsonWebsocketConsumer):
                         'setting': 'show_arch_suggestions'
                     }
                 })
+        elif content.get('msg_type') == 'command':
+            # A new question supersedes the one still being answered
+            self.cancel_command()
+            self.command_id = content.get('command_id', str(uuid.uuid4()))
+            self.command_cancelled = threading.Event()
+            thread = threading.Thread(target=command_processing.stream_commands,
+                                      args=(self.channel_name, self.command_id, content['command'], user_info,
+                                            content.get('allowed_commands', {}), self.command_cancelled))
+            thread.daemon = True
+            thread.start()
+        elif content.get('msg_type') == 'command_cancel':
+            if content.get('command_id', self.command_id) == self.command_id:
+                self.cancel_command()
         elif content.get('msg_type') == 'text_msg':
             textMessage = content.get('text', None)
             # Broadcast
@@ -105,6 +129,31 @@ class DaphneConsumer(JsonWebsocketConsumer):
             channel.basic_publish(exchange='', routing_key=queue_name, body='ping')
 
 
+    def cancel_command(self):
+        if self.command_cancelled is not None and not self.command_cancelled.is_set():
+            self.command_cancelled.set()
+            self.send_json({
+                'type': 'command.cancelled',
+                'command_id': self.command_id
+            })
+
+    def send_command_event(self, event):
+        # Events of a superseded question may still be in the channel layer when it is cancelled
+        if event['command_id'] == self.command_id and not self.command_cancelled.is_set():
+            self.send(json.dumps(event))
+
+    def command_classified(self, event):
+        self.send_command_event(event)
+
+    def command_answer(self, event):
+        self.send_command_event(event)
+
+    def command_finished(self, event):
+        self.send_command_event(event)
+
+    def command_error(self, event):
+        self.send_command_event(event)
+
     def ga_new_archs(self, event):
         print(event)
         self.send(json.dumps(event))
@@ -129,6 +178,8 @@ class DaphneConsumer(JsonWebsocketConsumer):
         """
         Called when the WebSocket closes for any reason.
         """
+        if self.command_cancelled is not None:
+            self.command_cancelled.set()
         # Leave all the rooms we are still in
         key = self.scope['path'].lstrip('api/')
         hash_key = hashlib.sha256(key.encode('utf-8')).hexdigest()
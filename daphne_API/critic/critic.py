@@ -1,17 +1,15 @@
-import json
-import math
 import sys
 import traceback
 
 import numpy as np
-from sqlalchemy.orm import sessionmaker
 
 import daphne_API.historian.models as models
 import daphne_API.problem_specific as problem_specific
+from daphne_API import dataset_cache
 from VASSAR_API.api import VASSARClient
 from daphne_API.eoss.runnable_functions.helpers import get_feature_unsatisfied, get_feature_satisfied, \
     feature_expression_to_string
-from daphne_API.models import UserInformation, Design
+from daphne_API.models import UserInformation
 from data_mining_API.api import DataMiningClient
 
 
@@ -19,8 +17,7 @@ class Critic:
 
     def __init__(self, context: UserInformation):
         # Connect to the CEOS database
-        self.engine = models.db_connect()
-        self.session = sessionmaker(bind=self.engine)()
+        self.session = models.get_session()
         self.context = context
         self.instruments_dataset = problem_specific.get_instrument_dataset(context.eosscontext.problem)
         self.orbits_dataset = problem_specific.get_orbit_dataset(context.eosscontext.problem)
@@ -137,7 +134,7 @@ class Critic:
         # Criticize architecture (based on rules)
         port = self.context.eosscontext.vassar_port
         problem = self.context.eosscontext.problem
-        inputs = json.loads(design.inputs)
+        inputs = design.inputs.tolist()
         client = VASSARClient(port)
         client.startConnection()
 
@@ -191,8 +188,8 @@ class Critic:
             out = out[0].upper() + out[1:]
             return out
 
-        original_outputs = json.loads(design.outputs)
-        original_inputs = json.loads(design.inputs)
+        original_outputs = design.outputs.tolist()
+        original_inputs = design.inputs.tolist()
         problem = self.context.eosscontext.problem
         port = self.context.eosscontext.vassar_port
         client = VASSARClient(port)
@@ -201,7 +198,7 @@ class Critic:
         archs = None
         advices = []
         if problem in self.assignation_problems:
-            archs = client.client.runLocalSearchBinaryInput(problem, json.loads(design.inputs))
+            archs = client.client.runLocalSearchBinaryInput(problem, original_inputs)
 
             for arch in archs:
                 new_outputs = arch.outputs
@@ -224,7 +221,7 @@ class Critic:
                 advice = "".join(advice)
                 advices.append(advice)
         elif problem in self.partition_problems:
-            archs = client.client.runLocalSearchDiscreteInput(problem, json.loads(design.inputs))
+            archs = client.client.runLocalSearchDiscreteInput(problem, original_inputs)
 
             # TODO: Add the delta code for discrete architectures
 
@@ -249,7 +246,7 @@ class Critic:
             problem_type = 'unknown'
 
         # Convert architecture format
-        missions = self.get_missions_from_genome(problem_type, json.loads(design.inputs))
+        missions = self.get_missions_from_genome(problem_type, design.inputs.tolist())
 
         # Type 2: Mission by mission
         missions_database = self.session.query(models.Mission)
@@ -306,31 +303,21 @@ class Critic:
             confidence_threshold = 0.2
             lift_threshold = 1
 
-            behavioral = []
-            non_behavioral = []
-
-            dataset = Design.objects.filter(eosscontext_id__exact=self.context.eosscontext.id).all()
+            dataset = dataset_cache.cache.get(self.context.eosscontext)
 
             if len(dataset) < 10:
                 raise ValueError("Could not run data mining: the number of samples is less than 10")
             else:
 
-                utopiaPoint = [0.26, 0]
-                temp = []
+                utopiaPoint = np.array([0.26, 0])
                 # Select the top N% archs based on the distance to the utopia point
-                for design in dataset:
-                    outputs = json.loads(this_design.outputs)
-                    id = design.id
-                    dist = math.sqrt((outputs[0] - utopiaPoint[0]) ** 2 + (outputs[1] - utopiaPoint[1]) ** 2)
-                    temp.append((id, dist))
-
-                # Sort the list based on the distance to the utopia point
-                temp = sorted(temp, key=lambda x: x[1])
-                for i in range(len(temp)):
-                    if i <= len(temp) // 10:  # Label the top 10% architectures as behavioral
-                        behavioral.append(temp[i][0])
-                    else:
-                        non_behavioral.append(temp[i][0])
+                distances = np.sqrt(((dataset.first_outputs(2) - utopiaPoint) ** 2).sum(axis=1))
+
+                # Sort the ids based on the distance to the utopia point
+                sorted_ids = dataset.ids[np.argsort(distances, kind='mergesort')].tolist()
+                # Label the top 10% architectures as behavioral
+                behavioral = sorted_ids[:len(sorted_ids) // 10 + 1]
+                non_behavioral = sorted_ids[len(sorted_ids) // 10 + 1:]
 
             # Extract feature
             # features = client.getDrivingFeatures(behavioral, non_behavioral, designs, support_threshold, confidence_threshold, lift_threshold)
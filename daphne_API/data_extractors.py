@@ -1,13 +1,12 @@
-import operator
-import Levenshtein as lev
-from sqlalchemy.orm import sessionmaker
-import pandas
 import daphne_API.historian.models as earth_models
 from django.conf import settings
 if 'EDL' in settings.ACTIVE_MODULES:
     import daphne_API.edl.model as edl_models
 if 'EOSS' in settings.ACTIVE_MODULES:
     from daphne_API import problem_specific
+from daphne_API import fuzzy_matcher, resource_cache
+from daphne_API.design_helpers import existing_design_ids
+from daphne_API.gazetteer import gazetteer
 from daphne_API.models import EOSSContext, UserInformation
 from django.conf import settings
 
@@ -15,36 +14,12 @@ import os
 import scipy.io
 import pandas as pd
 import json
-
-
-instruments_sheet = pandas.read_excel('./daphne_API/xls/Climate-centric/Climate-centric AttributeSet.xls', sheet_name='Instrument')
-measurements_sheet = pandas.read_excel('./daphne_API/xls/Climate-centric/Climate-centric AttributeSet.xls', sheet_name='Measurement')
-param_names = []
-for row in measurements_sheet.itertuples(index=True, name='Measurement'):
-    if row[2] == 'Parameter':
-        for i in range(6, len(row)):
-            param_names.append(row[i])
+import re
 
 
 def feature_list_by_ratio(processed_question, feature_list):
     """ Obtain a list of all the features in the list sorted by partial similarity to the question"""
-    ratio_ordered = []
-    length_question = len(processed_question.text)
-    for feature in feature_list:
-        length_feature = len(feature)
-        if length_feature > length_question:
-            ratio_ordered.append((feature, 0, -1))
-        else:
-            substrings = [processed_question.text[i:i+length_feature].lower() for i in range(length_question-length_feature+1)]
-            ratios = [lev.ratio(substrings[i], feature.lower()) for i in range(length_question-length_feature+1)]
-            max_index, max_ratio = max(enumerate(ratios), key=operator.itemgetter(1))
-            ratio_ordered.append((feature, max_ratio, max_index))
-
-    # Keep the longest string by default
-    ratio_ordered = sorted(ratio_ordered, key=lambda ratio_info: -len(ratio_info[0]))
-    ratio_ordered = sorted(ratio_ordered, key=lambda ratio_info: -ratio_info[1])
-    ratio_ordered = [ratio_info for ratio_info in ratio_ordered if ratio_info[1] > 0.75]
-    return ratio_ordered
+    return fuzzy_matcher.match(processed_question.text, feature_list)
 
 
 def crop_list(list, max_size):
@@ -62,35 +37,44 @@ def sorted_list_of_features_by_index(processed_question, feature_list, number_of
     return obt_feature_list
 
 
-def extract_mission(processed_question, number_of_features, context: UserInformation):
+def mission_features(context: UserInformation):
     # Get a list of missions
-    engine = earth_models.db_connect()
-    session = sessionmaker(bind=engine)()
-    missions = [' ' + mission.name.strip().lower() for mission in session.query(earth_models.Mission).all()]
+    return gazetteer.features('missions')
+
+
+def extract_mission(processed_question, number_of_features, context: UserInformation):
+    missions = mission_features(context)
     return sorted_list_of_features_by_index(processed_question, missions, number_of_features)
 
 
-def extract_measurement(processed_question, number_of_features, context: UserInformation):
+def measurement_features(context: UserInformation):
     # Get a list of measurements
-    engine = earth_models.db_connect()
-    session = sessionmaker(bind=engine)()
-    measurements = [measurement.name.strip().lower() for measurement in session.query(earth_models.Measurement).all()]
+    return gazetteer.features('measurements')
+
+
+def extract_measurement(processed_question, number_of_features, context: UserInformation):
+    measurements = measurement_features(context)
     return sorted_list_of_features_by_index(processed_question, measurements, number_of_features)
 
 
-def extract_technology(processed_question, number_of_features, context: UserInformation):
+def technology_features(context: UserInformation):
     # Get a list of technologies and types
-    engine = earth_models.db_connect()
-    session = sessionmaker(bind=engine)()
     technologies = [technology for technology in earth_models.technologies]
-    technologies = technologies + [type.name.strip().lower() for type in session.query(earth_models.InstrumentType).all()]
+    return technologies + gazetteer.features('instrument_types')
+
+
+def extract_technology(processed_question, number_of_features, context: UserInformation):
+    technologies = technology_features(context)
     return sorted_list_of_features_by_index(processed_question, technologies, number_of_features)
 
+
+def space_agency_features(context: UserInformation):
+    # Get a list of space agencies
+    return gazetteer.features('agencies')
+
+
 def extract_space_agency(processed_question, number_of_features, context: UserInformation):
-    # Get a list of technologies and types
-    engine = earth_models.db_connect()
-    session = sessionmaker(bind=engine)()
-    agencies = [' ' + agency.name.strip().lower() for agency in session.query(earth_models.Agency).all()]
+    agencies = space_agency_features(context)
     return sorted_list_of_features_by_index(processed_question, agencies, number_of_features)
 
 
@@ -105,12 +89,14 @@ def extract_date(processed_question, number_of_features, context: UserInformatio
 
 
 def extract_design_id(processed_question, number_of_features, context: UserInformation):
-    # Get a list of design ids
-    design_ids = ['d' + str(design.id) for design in context.eosscontext.design_set.all()]
+    # Look up the words that look like design ids in the dataset
+    candidates = [word.text for word in processed_question if re.fullmatch(r'd\d+', word.text)]
+    design_ids = existing_design_ids(context.eosscontext, [int(candidate[1:]) for candidate in candidates]) \
+        if len(candidates) > 0 else set()
     extracted_list = []
-    for word in processed_question:
-        if word.text in design_ids:
-            extracted_list.append(word.text)
+    for candidate in candidates:
+        if int(candidate[1:]) in design_ids:
+            extracted_list.append(candidate)
     return crop_list(extracted_list, number_of_features)
 
 
@@ -123,27 +109,43 @@ def extract_agent(processed_question, number_of_features, context: UserInformati
     return crop_list(extracted_list, number_of_features)
 
 
+def instrument_parameter_features(context: UserInformation):
+    return problem_specific.get_instruments_sheet(context.eosscontext.problem)['Attributes-for-object-Instrument']
+
+
 def extract_instrument_parameter(processed_question, number_of_features, context: UserInformation):
-    instrument_parameters = \
-        problem_specific.get_instruments_sheet(context.eosscontext.problem)['Attributes-for-object-Instrument']
+    instrument_parameters = instrument_parameter_features(context)
     return sorted_list_of_features_by_index(processed_question, instrument_parameters, number_of_features)
 
 
+def vassar_instrument_features(context: UserInformation):
+    return [instr["name"] for instr in problem_specific.get_instrument_dataset(context.eosscontext.problem)]
+
+
 def extract_vassar_instrument(processed_question, number_of_features, context: UserInformation):
-    options = [instr["name"] for instr in problem_specific.get_instrument_dataset(context.eosscontext.problem)]
+    options = vassar_instrument_features(context)
     return sorted_list_of_features_by_index(processed_question, options, number_of_features)
 
 
+def vassar_measurement_features(context: UserInformation):
+    return problem_specific.get_param_names(context.eosscontext.problem)
+
+
 def extract_vassar_measurement(processed_question, number_of_features, context: UserInformation):
-    param_names = problem_specific.get_param_names(context.eosscontext.problem)
+    param_names = vassar_measurement_features(context)
     return sorted_list_of_features_by_index(processed_question, param_names, number_of_features)
 
 
+def vassar_stakeholder_features(context: UserInformation):
+    return problem_specific.get_stakeholders_list(context.eosscontext.problem)
+
+
 def extract_vassar_stakeholder(processed_question, number_of_features, context: UserInformation):
-    options = problem_specific.get_stakeholders_list(context.eosscontext.problem)
+    options = vassar_stakeholder_features(context)
     return sorted_list_of_features_by_index(processed_question, options, number_of_features)
 
-def extract_vassar_objective(processed_question, number_of_features, context: EOSSContext):
+
+def vassar_objective_features(context):
     options = ["ATM" + str(i) for i in range(1,10)]
     options.extend(["OCE" + str(i) for i in range(1,10)])
     options.extend(["TER" + str(i) for i in range(1, 10)])
@@ -152,18 +154,27 @@ def extract_vassar_objective(processed_question, number_of_features, context: EO
     options.extend(["ECO" + str(i) for i in range(1, 10)])
     options.extend(["WAT" + str(i) for i in range(1, 10)])
     options.extend(["HEA" + str(i) for i in range(1, 10)])
+    return options
+
+
+def extract_vassar_objective(processed_question, number_of_features, context: EOSSContext):
+    options = vassar_objective_features(context)
     return sorted_list_of_features_by_index(processed_question, options, number_of_features)
 
-def extract_edl_mission(processed_question, number_of_features, context):
+
+def edl_mission_features(context):
     # Get a list of missions
-    engine = edl_models.db_connect()
-    session = sessionmaker(bind=engine)()
-    missions = [missions.name.strip().lower() for missions in session.query(edl_models.Mission).all()]
+    return gazetteer.features('edl_missions')
+
+
+def extract_edl_mission(processed_question, number_of_features, context):
+    missions = edl_mission_features(context)
     return sorted_list_of_features_by_index(processed_question, missions, number_of_features)
 
-def extract_edl_parameter(processed_question, number_of_features, context):
+
+def edl_parameter_features(context):
     # Get a list of parameters
-    parameters = ["entry mass", "name", "full name", "status", "launch date", "launch vehicle", "applications",
+    return ["entry mass", "name", "full name", "status", "launch date", "launch vehicle", "applications",
                   "touchdown mass", "useful landed mass", "landing site elevation", "landing site", "entry strategy",
                   "entry vehicle","entry interface X","entry interface Y", "entry interface Z", "orbital direction",
                   "entry velocity", "entry lift control","entry attitude control", "entry guidance",
@@ -178,6 +189,10 @@ def extract_edl_parameter(processed_question, number_of_features, context):
                   "touchdown vertical velocity", "touchdown horizontal velocity", "touchdown attenuation",
                   "touchdown rock height capability", "touchdown slope capability", "touchdown sensor",
                   "touchdown sensing", "simulation"]
+
+
+def extract_edl_parameter(processed_question, number_of_features, context):
+    parameters = edl_parameter_features(context)
     return sorted_list_of_features_by_index(processed_question, parameters, number_of_features)
 
 
@@ -223,7 +238,7 @@ if 'EDL' in settings.ACTIVE_MODULES:
     list_items = list(mat_dict.keys())
     '''Get the NL description of the variable'''
     xls_path = os.path.join(settings.EDL_PATH, 'Code_Daphne/command_classifier/edlsimqueries.xlsx')
-    file_path = pandas.read_excel(xls_path)
+    file_path = resource_cache.read_excel(xls_path)
     list_descriptions = list(file_path[0])
 
 
@@ -0,0 +1,65 @@
+import atexit
+import logging
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine.url import URL
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+logger = logging.getLogger('debugging')
+
+# Every pooled database of this process, so they can be cleaned up together
+databases = []
+
+
+class PooledDatabase:
+    """
+    A process-wide engine (and its connection pool) for one of the SQLAlchemy databases, created the first time it is
+    needed, with a session factory that gives each thread its own session.
+    """
+
+    def __init__(self, name, database_settings, pool_settings):
+        self.name = name
+        self.database_settings = database_settings
+        self.pool_settings = pool_settings
+        self._engine = None
+        self._lock = threading.Lock()
+        self.sessions = scoped_session(sessionmaker())
+        databases.append(self)
+
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    logger.info("Creating the " + self.name + " database engine")
+                    engine = create_engine(URL(**self.database_settings), **self.pool_settings)
+                    self.sessions.configure(bind=engine)
+                    self._engine = engine
+        return self._engine
+
+    def session(self):
+        """ Returns the session of the current thread, which is reused until remove_session is called """
+        self.engine()
+        return self.sessions()
+
+    def remove_session(self):
+        """ Closes the session of the current thread, giving its connection back to the pool """
+        self.sessions.remove()
+
+    def dispose(self):
+        self.sessions.remove()
+        if self._engine is not None:
+            self._engine.dispose()
+
+
+def remove_sessions():
+    for database in databases:
+        database.remove_session()
+
+
+def dispose_all():
+    for database in databases:
+        database.dispose()
+
+
+atexit.register(dispose_all)
@@ -0,0 +1,162 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.db.models import F
+
+from daphne_API import design_encoding
+from daphne_API.models import Design, EOSSContext
+
+# Maximum number of datasets kept in memory, one per EOSSContext
+CACHE_SIZE = 64
+
+
+def unpack_column(packed_rows):
+    """
+    The inputs or outputs of many designs as a 2D array with a row per design, or if they don't all have the same
+    length (which the JSON encoding allows) as a 1D object array with the list of values of each design
+    """
+    try:
+        return design_encoding.unpack_rows(packed_rows)
+    except ValueError:
+        column = np.empty(len(packed_rows), dtype=object)
+        for row, packed in enumerate(packed_rows):
+            column[row] = design_encoding.unpack(packed).tolist()
+        return column
+
+
+def column_width(column):
+    """ Number of values of the longest design in a column made by unpack_column """
+    if column.ndim == 2:
+        return column.shape[1]
+    return max((len(values) for values in column), default=0)
+
+
+class DesignDataset:
+    """
+    The designs in the dataset of an EOSSContext as NumPy arrays: their ids, and a row of inputs and a row of outputs
+    per design in the same order (see unpack_column for designs of different lengths). The arrays are never modified,
+    adding designs builds a new DesignDataset.
+    """
+
+    def __init__(self, version, ids, inputs, outputs):
+        self.version = version
+        self.ids = ids
+        self.inputs = inputs
+        self.outputs = outputs
+        self._rows = {design_id: row for row, design_id in enumerate(ids.tolist())}
+
+    @classmethod
+    def from_designs(cls, version, designs):
+        designs = list(designs)
+        return cls(version, np.array([design.id for design in designs], dtype=np.int64),
+                   unpack_column([design.packed_inputs for design in designs]),
+                   unpack_column([design.packed_outputs for design in designs]))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, design_id):
+        """ The position of a design in the arrays, None if it is not in the dataset """
+        return self._rows.get(design_id)
+
+    def input_width(self):
+        return column_width(self.inputs)
+
+    def output_width(self):
+        return column_width(self.outputs)
+
+    def first_outputs(self, count):
+        """ The first count outputs of every design as a float array, with NaN where a design has fewer """
+        if self.outputs.ndim == 2 and self.outputs.shape[1] >= count:
+            return self.outputs[:, :count].astype(np.float64)
+        first = np.full((len(self), count), np.nan)
+        for row, values in enumerate(self.outputs.tolist()):
+            values = values[:count]
+            first[row, :len(values)] = values
+        return first
+
+    def designs(self):
+        """ (id, inputs, outputs) of every design, as Python lists like the thrift clients and JSON responses need """
+        return list(zip(self.ids.tolist(), self.inputs.tolist(), self.outputs.tolist()))
+
+    def extended(self, version, designs):
+        """ A new dataset with the designs appended, except those that are in it already """
+        added = DesignDataset.from_designs(version, [design for design in designs if design.id not in self._rows])
+        if len(self) == 0 or len(added) == 0:
+            return added if len(self) == 0 else DesignDataset(version, self.ids, self.inputs, self.outputs)
+        return DesignDataset(version, np.concatenate([self.ids, added.ids]),
+                             np.concatenate([self.inputs, added.inputs]),
+                             np.concatenate([self.outputs, added.outputs]))
+
+
+def load_dataset(eosscontext: EOSSContext):
+    version = EOSSContext.objects.values_list('dataset_version', flat=True).get(id=eosscontext.id)
+    designs = Design.objects.filter(eosscontext_id__exact=eosscontext.id).order_by('design_id')\
+        .only('id', 'packed_inputs', 'packed_outputs')
+    return DesignDataset.from_designs(version, designs)
+
+
+def bump_version(eosscontext: EOSSContext):
+    """ Increment dataset_version in the database, so every process sees the dataset changed, and in eosscontext """
+    EOSSContext.objects.filter(id=eosscontext.id).update(dataset_version=F('dataset_version') + 1)
+    eosscontext.dataset_version = EOSSContext.objects.values_list('dataset_version', flat=True).get(id=eosscontext.id)
+
+
+class DatasetCache:
+    """
+    LRU cache of the datasets of the EOSSContexts as DesignDataset arrays. A dataset is loaded from the database the
+    first time it is needed and again whenever the dataset_version of its EOSSContext moves past the cached one, so
+    processes other than the one changing a dataset notice it. The process changing it keeps its arrays up to date.
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store(self, eosscontext_id, dataset):
+        with self._lock:
+            cached = self._datasets.get(eosscontext_id)
+            if cached is None or cached.version <= dataset.version:
+                self._datasets[eosscontext_id] = dataset
+                self._datasets.move_to_end(eosscontext_id)
+            while len(self._datasets) > self.size:
+                self._datasets.popitem(last=False)
+
+    def get(self, eosscontext: EOSSContext):
+        with self._lock:
+            dataset = self._datasets.get(eosscontext.id)
+            if dataset is not None and dataset.version >= eosscontext.dataset_version:
+                self._datasets.move_to_end(eosscontext.id)
+                return dataset
+        dataset = load_dataset(eosscontext)
+        self._store(eosscontext.id, dataset)
+        return dataset
+
+    def add(self, eosscontext: EOSSContext, designs):
+        """ Append designs just saved to the dataset of eosscontext to its cached arrays """
+        bump_version(eosscontext)
+        with self._lock:
+            dataset = self._datasets.pop(eosscontext.id, None)
+        # Only extend the arrays if nobody else changed the dataset since they were loaded
+        if dataset is not None and dataset.version == eosscontext.dataset_version - 1:
+            try:
+                self._store(eosscontext.id, dataset.extended(eosscontext.dataset_version, designs))
+            except ValueError:
+                # Designs of a different length than the rest, the dataset is loaded again when needed
+                pass
+
+    def replace(self, eosscontext: EOSSContext, designs):
+        """ After removing the designs of eosscontext, cache the ones replacing them (which may be none) """
+        bump_version(eosscontext)
+        self._store(eosscontext.id, DesignDataset.from_designs(eosscontext.dataset_version, designs))
+
+    def invalidate(self, eosscontext: EOSSContext):
+        """ Forget the arrays of a dataset after some of its designs are deleted """
+        bump_version(eosscontext)
+        with self._lock:
+            self._datasets.pop(eosscontext.id, None)
+
+
+cache = DatasetCache()
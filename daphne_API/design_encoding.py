@@ -0,0 +1,104 @@
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+# The first byte of a packed array says how the rest is stored
+JSON = 0
+BITS = 1
+INT8 = 2
+INT16 = 3
+INT32 = 4
+FLOAT64 = 5
+
+DTYPES = {
+    INT8: np.dtype('<i1'),
+    INT16: np.dtype('<i2'),
+    INT32: np.dtype('<i4'),
+    FLOAT64: np.dtype('<f8')
+}
+
+# Bit-packed arrays keep their length after the code, as the last byte may be padded
+BITS_HEADER = struct.Struct('<BI')
+
+
+def pack(values):
+    """
+    Pack the inputs or outputs of a design: bits for binary genomes, the smallest integer type that fits for
+    discrete ones and float64 for anything else numeric. Values NumPy can't make an array of are kept as JSON.
+    """
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = np.zeros((0, 0))
+    if array.dtype == np.bool_ and array.ndim == 1:
+        return BITS_HEADER.pack(BITS, len(array)) + np.packbits(array).tobytes()
+    if array.dtype.kind in 'iu' and array.ndim == 1:
+        for code in [INT8, INT16, INT32]:
+            limits = np.iinfo(DTYPES[code])
+            if len(array) == 0 or (limits.min <= array.min() and array.max() <= limits.max):
+                return bytes([code]) + array.astype(DTYPES[code]).tobytes()
+    if array.dtype.kind in 'iuf' and array.ndim == 1:
+        return bytes([FLOAT64]) + array.astype(DTYPES[FLOAT64]).tobytes()
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    return bytes([JSON]) + json.dumps(values).encode('utf-8')
+
+
+def pack_outputs(values):
+    """ Outputs are always stored as float64, whatever type the objectives came with """
+    return pack(np.asarray(values, dtype=np.float64))
+
+
+def digest(packed):
+    """ A short hex digest of packed inputs, the same for every design with the same inputs """
+    return hashlib.blake2b(bytes(packed), digest_size=16).hexdigest()
+
+
+def unpack(packed):
+    """ The read-only array stored with pack. Database drivers may give a memoryview or a bytearray instead of bytes """
+    if not isinstance(packed, bytes):
+        packed = bytes(packed)
+    if len(packed) == 0:
+        array = np.zeros(0)
+    elif packed[0] == BITS:
+        length = BITS_HEADER.unpack_from(packed)[1]
+        array = np.unpackbits(np.frombuffer(packed, dtype=np.uint8, offset=BITS_HEADER.size))[:length].view(np.bool_)
+    elif packed[0] in DTYPES:
+        array = np.frombuffer(packed, dtype=DTYPES[packed[0]], offset=1)
+    elif packed[0] == JSON:
+        values = json.loads(packed[1:].decode('utf-8'))
+        try:
+            array = np.asarray(values)
+        except ValueError:
+            # Lists of different lengths, which NumPy only keeps as objects
+            array = np.array(values, dtype=object)
+    else:
+        raise ValueError('Unknown design encoding ' + str(packed[0]))
+    array.flags.writeable = False
+    return array
+
+
+def unpack_rows(packed_rows):
+    """
+    Unpack the inputs or outputs of many designs as a 2D array with a row per design. When all of them were packed
+    the same way, as happens within a dataset, the whole column is unpacked with a single NumPy call.
+    """
+    packed_rows = [packed if isinstance(packed, bytes) else bytes(packed) for packed in packed_rows]
+    if len(packed_rows) == 0:
+        return np.zeros((0, 0))
+    first = packed_rows[0]
+    code = first[0] if len(first) > 0 else JSON
+    header_size = BITS_HEADER.size if code == BITS else 1
+    header = first[:header_size]
+    if (code == BITS or code in DTYPES) and all(len(packed) == len(first) and packed.startswith(header)
+                                                for packed in packed_rows):
+        payload = b''.join(packed[header_size:] for packed in packed_rows)
+        if code == BITS:
+            length = BITS_HEADER.unpack_from(first)[1]
+            rows = np.frombuffer(payload, dtype=np.uint8).reshape(len(packed_rows), -1)
+            return np.unpackbits(rows, axis=1)[:, :length].view(np.bool_)
+        return np.frombuffer(payload, dtype=DTYPES[code]).reshape(len(packed_rows), -1)
+    return np.stack([unpack(packed) for packed in packed_rows])
+
@@ -1,35 +1,119 @@
-import json
+from django.db import IntegrityError, transaction
+from django.db.models import F
 
+from daphne_API import dataset_cache, design_encoding
 from daphne_API.diversifier import activate_diversifier
 from daphne_API.models import Design, EOSSContext, ActiveContext
 
 
-def add_design(design, eosscontext: EOSSContext, active: bool):
+def input_digest(inputs):
+    return design_encoding.digest(design_encoding.pack(inputs))
+
+
+def new_designs(designs, eosscontext: EOSSContext, active: bool):
     """
-    This function adds a design to the database, updates all related counters and calls related functions if needed.
-    Always use this function to add new designs
-    :param eosscontext: The eosscontext object from the DB, use this or active
-    :param activecontext: The activecontext object from the DB, use this or eoss
-    :param design: A JSON dictionary with the design, with fields id, inputs and outputs
-    :return: Nothing
+    Find the designs whose inputs are not in the dataset (or the background search queue) yet, with a single query.
+    A design queued by the background search can still be added to the dataset, the queue drops it when it is moved
+    :param designs: A list of JSON dictionaries with the designs, with at least the field inputs
+    :param eosscontext: The eosscontext object from the DB
+    :param active: Whether to look in the background search queue instead of the dataset
+    :return: The designs that are new, in the same order and without repeating inputs
     """
+    digests = [input_digest(design['inputs']) for design in designs]
+    owner = {'activecontext': eosscontext.activecontext} if active else {'eosscontext': eosscontext}
+    seen = set(Design.objects.filter(input_digest__in=set(digests), **owner).values_list('input_digest', flat=True))
+    result = []
+    for design, digest in zip(designs, digests):
+        if digest not in seen:
+            seen.add(digest)
+            result.append(design)
+    return result
+
+
+def get_design(eosscontext: EOSSContext, design_id):
+    """ The design of the dataset with this id, or None. A single query on the (eosscontext, id) index """
+    return Design.objects.filter(eosscontext=eosscontext, id=design_id).first()
 
-    if active:
-        Design.objects.create(activecontext=eosscontext.activecontext,
-                              id=design['id'],
-                              inputs=json.dumps(design['inputs']),
-                              outputs=json.dumps(design['outputs']))
-    else:
-        Design.objects.create(eosscontext=eosscontext,
-                              id=design['id'],
-                              inputs=json.dumps(design['inputs']),
-                              outputs=json.dumps(design['outputs']))
-        eosscontext.added_archs_count += 1
-
-    eosscontext.last_arch_id += 1
 
+def existing_design_ids(eosscontext: EOSSContext, design_ids):
+    """ The ids from design_ids that are in the dataset, with a single query on the (eosscontext, id) index """
+    return set(Design.objects.filter(eosscontext=eosscontext, id__in=set(design_ids)).values_list('id', flat=True))
+
+
+def increment_counters(eosscontext: EOSSContext, **increments):
+    """ Atomically add to counters of eosscontext in the database, and reload them into eosscontext """
+    EOSSContext.objects.filter(id=eosscontext.id).update(**{field: F(field) + amount
+                                                            for field, amount in increments.items()})
+    eosscontext.refresh_from_db(fields=list(increments))
+
+
+def count_added_designs(eosscontext: EOSSContext, number_of_designs):
+    """ Count designs just added to the dataset, running the diversifier once every 5 of them """
+    increment_counters(eosscontext, added_archs_count=number_of_designs)
     if eosscontext.added_archs_count >= 5:
-        eosscontext.added_archs_count = 0
+        increment_counters(eosscontext, added_archs_count=-eosscontext.added_archs_count)
         activate_diversifier(eosscontext)
 
-    eosscontext.save()
+
+def make_design(design, eosscontext: EOSSContext, active: bool):
+    if active:
+        return Design(activecontext=eosscontext.activecontext, id=design['id'], inputs=design['inputs'],
+                      outputs=design['outputs'])
+    return Design(eosscontext=eosscontext, id=design['id'], inputs=design['inputs'], outputs=design['outputs'])
+
+
+def add_designs(designs, eosscontext: EOSSContext, active: bool):
+    """
+    This function adds a batch of designs to the database with a single insert, updates all related counters once
+    and calls related functions (the diversifier) at most once. Always use this function or add_design to add new
+    designs
+    :param designs: A list of JSON dictionaries with the designs, with fields inputs and outputs. Their ids are set
+    here, from eosscontext.last_arch_id
+    :param eosscontext: The eosscontext object from the DB
+    :param active: Whether the designs go to the background search queue instead of the dataset
+    :return: The designs that were added, those whose inputs were already in the dataset (or the queue, if active)
+    are not
+    """
+    designs = new_designs(designs, eosscontext, active)
+    if len(designs) == 0:
+        return []
+
+    # Reserve the ids of the batch
+    increment_counters(eosscontext, last_arch_id=len(designs))
+    for index, design in enumerate(designs):
+        design['id'] = eosscontext.last_arch_id - len(designs) + index
+
+    rows = [make_design(design, eosscontext, active) for design in designs]
+    try:
+        with transaction.atomic():
+            Design.objects.bulk_create(rows)
+    except IntegrityError:
+        # Some of them were added since new_designs, the rest are added one by one
+        added = []
+        for design in designs:
+            row = make_design(design, eosscontext, active)
+            try:
+                with transaction.atomic():
+                    row.save(force_insert=True)
+                added.append((design, row))
+            except IntegrityError:
+                pass
+        designs = [design for design, row in added]
+        rows = [row for design, row in added]
+
+    if not active and len(rows) > 0:
+        dataset_cache.cache.add(eosscontext, rows)
+        count_added_designs(eosscontext, len(rows))
+    return designs
+
+
+def add_design(design, eosscontext: EOSSContext, active: bool):
+    """
+    This function adds a design to the database, see add_designs
+    :param eosscontext: The eosscontext object from the DB
+    :param design: A JSON dictionary with the design, with fields inputs and outputs. Its id is set here
+    :param active: Whether the design goes to the background search queue instead of the dataset
+    :return: Whether the design was added, it is not when its inputs are already in the dataset (or the queue, if
+    active)
+    """
+    return len(add_designs([design], eosscontext, active)) > 0
@@ -1,11 +1,11 @@
-import json
 import random
 
 import numpy as np
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
-from daphne_API.models import EOSSContext, Design
+from daphne_API import dataset_cache
+from daphne_API.models import EOSSContext
 
 
 def activate_diversifier(eosscontext: EOSSContext):
@@ -13,13 +13,13 @@ def activate_diversifier(eosscontext: EOSSContext):
         return
 
     # 1. Compute the pareto front
-    dataset = Design.objects.filter(eosscontext_id__exact=eosscontext.id).all()
+    dataset = dataset_cache.cache.get(eosscontext)
     json_dataset = []
-    for design in dataset:
+    for design_id, inputs, outputs in dataset.designs():
         json_dataset.append({
-            "id": design.id,
-            "inputs": json.loads(design.inputs),
-            "outputs": json.loads(design.outputs)
+            "id": design_id,
+            "inputs": inputs,
+            "outputs": outputs
         })
     pareto_front = compute_pareto_front(json_dataset, [1, -1])
     sorted_pareto_front = sorted(pareto_front, key=lambda design: design["outputs"][0])
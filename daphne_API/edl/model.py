@@ -3,9 +3,9 @@ from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime,
 from sqlalchemy.orm import relationship
 
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.engine.url import URL
 
 import daphne_brain.settings as settings
+from daphne_API.database_pool import PooledDatabase
 
 # Import pandas
 import pandas
@@ -17,13 +17,22 @@ import pandas as pd
 # Define Table
 DeclarativeBase = declarative_base()
 
+database = PooledDatabase('EDL', settings.EDL_DATABASE, settings.ALCHEMY_POOL)
+
 
 def db_connect():
     """
     Performs database connection using database settings from settings.py.
-    Returns sqlalchemy engine instance
+    Returns the sqlalchemy engine instance shared by the whole process
+    """
+    return database.engine()
+
+
+def get_session():
+    """
+    Returns the sqlalchemy session of the current thread
     """
-    return create_engine(URL(**settings.EDL_DATABASE))  # connection and configuration is assembled
+    return database.session()
 
 
 def create_tables(engine):
@@ -0,0 +1,159 @@
+import logging
+import threading
+
+from django.conf import settings
+
+import daphne_API.data_extractors as extractors
+from daphne_API.gazetteer import gazetteer
+from daphne_API.models import UserInformation
+from daphne_brain.nlp_object import nlp
+
+logger = logging.getLogger('debugging')
+
+# Parameter types found by exact mention, with the function giving the same features their extractor compares with
+tagged_features = {
+    "mission": extractors.mission_features,
+    "measurement": extractors.measurement_features,
+    "technology": extractors.technology_features,
+    "space_agency": extractors.space_agency_features
+}
+# These depend on the problem loaded by the user
+problem_tagged_features = {}
+if 'EOSS' in settings.ACTIVE_MODULES:
+    problem_tagged_features["instrument_parameter"] = extractors.instrument_parameter_features
+    problem_tagged_features["vassar_instrument"] = extractors.vassar_instrument_features
+    problem_tagged_features["vassar_measurement"] = extractors.vassar_measurement_features
+    problem_tagged_features["vassar_stakeholder"] = extractors.vassar_stakeholder_features
+    tagged_features["objective"] = extractors.vassar_objective_features
+if 'EDL' in settings.ACTIVE_MODULES:
+    tagged_features["edl_mission"] = extractors.edl_mission_features
+    tagged_features["name"] = extractors.edl_mission_features
+    tagged_features["parameter"] = extractors.edl_parameter_features
+
+
+class AhoCorasickNode:
+    def __init__(self):
+        self.children = {}
+        self.fail = None
+        # (parameter type, feature, index in its feature list, number of tokens) of every entity ending at this node
+        self.outputs = []
+
+
+class EntityTagger:
+    """
+    Aho-Corasick automaton over the lowercased tokens of every entity name, finding all the exact mentions of all
+    the parameter types in a single pass over the tokens of a question.
+    """
+
+    def __init__(self, features_by_type):
+        self.root = AhoCorasickNode()
+        for param_type, features in features_by_type.items():
+            names = [(feature_index, feature) for feature_index, feature in enumerate(features)
+                     if isinstance(feature, str) and feature.strip() != ""]
+            for (feature_index, feature), tokens in zip(names, nlp.tokenizer.pipe(name.strip().lower()
+                                                                                  for _, name in names)):
+                self.add(param_type, feature, feature_index, [token.lower_ for token in tokens if not token.is_space])
+        self.build_failure_links()
+
+    def add(self, param_type, feature, feature_index, tokens):
+        if len(tokens) == 0:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.children.setdefault(token, AhoCorasickNode())
+        node.outputs.append((param_type, feature, feature_index, len(tokens)))
+
+    def build_failure_links(self):
+        queue = []
+        for child in self.root.children.values():
+            child.fail = self.root
+            queue.append(child)
+        for node in queue:
+            for token, child in node.children.items():
+                fail = node.fail
+                while fail is not None and token not in fail.children:
+                    fail = fail.fail
+                child.fail = fail.children[token] if fail is not None else self.root
+                child.outputs = child.outputs + child.fail.outputs
+                queue.append(child)
+
+    def tag(self, processed_question):
+        """
+        Returns, for each parameter type, the features mentioned in the question as (character index, feature,
+        index in its feature list), in order of appearance and keeping only the first mention of each feature
+        """
+        mentions = {}
+        seen = set()
+        tokens = [token for token in processed_question if not token.is_space]
+        node = self.root
+        for position, token in enumerate(tokens):
+            while node is not self.root and token.lower_ not in node.children:
+                node = node.fail
+            node = node.children.get(token.lower_, self.root)
+            for param_type, feature, feature_index, length in node.outputs:
+                if (param_type, feature) in seen:
+                    continue
+                seen.add((param_type, feature))
+                start_index = tokens[position - length + 1].idx
+                mentions.setdefault(param_type, []).append((start_index, feature, feature_index))
+        for param_type in mentions:
+            mentions[param_type].sort(key=lambda mention: mention[0])
+        return mentions
+
+
+class EntityTaggerCache:
+    """
+    One tagger per problem and set of parameter types, rebuilt when the gazetteer reloads any of its vocabularies.
+    Only the vocabularies of the types a question needs are built.
+    """
+
+    def __init__(self):
+        self._taggers = {}
+        self._lock = threading.Lock()
+
+    def get(self, context: UserInformation, param_types):
+        param_types = tuple(sorted(param_type for param_type in set(param_types) if is_tagged(param_type)))
+        problem = context.eosscontext.problem if any(param_type in problem_tagged_features
+                                                     for param_type in param_types) else None
+        features_by_type = {}
+        for param_type in param_types:
+            features = tagged_features.get(param_type) or problem_tagged_features[param_type]
+            try:
+                features_by_type[param_type] = features(context)
+            except Exception:
+                # Not every problem has all of its datasets, and the historian and EDL vocabularies come from
+                # databases that may not be reachable, these types are left to the fuzzy extractors
+                logger.exception("Could not get the " + param_type + " features for the entity tagger")
+        # Read after getting the features, as that is what may reload the gazetteer
+        key = (problem, param_types, gazetteer.version)
+
+        tagger = self._taggers.get((problem, param_types))
+        if tagger is not None and tagger[0] == key:
+            return tagger[1]
+        with self._lock:
+            tagger = self._taggers.get((problem, param_types))
+            if tagger is None or tagger[0] != key:
+                logger.info("Building the entity tagger for problem " + str(problem) + " and " + str(param_types))
+                tagger = (key, EntityTagger(features_by_type))
+                self._taggers[(problem, param_types)] = tagger
+        return tagger[1]
+
+
+taggers = EntityTaggerCache()
+
+
+def exact_features(mentions, number_of_features):
+    """ Pick the mentions the fuzzy extractor would have chosen, as all of them have a ratio of 1 """
+    # Keep the longest string by default, and the first in the feature list among those as long, like sort_by_ratio
+    chosen = sorted(mentions, key=lambda mention: (-len(mention[1]), mention[2]))[:number_of_features]
+    chosen = sorted(chosen, key=lambda mention: mention[0])
+    return [mention[1] for mention in chosen]
+
+
+def is_tagged(param_type):
+    return param_type in tagged_features or param_type in problem_tagged_features
+
+
+def tag(processed_question, context: UserInformation, param_types):
+    """ Exact mentions of the parameter types given, those which are tagged at all """
+    return taggers.get(context, param_types).tag(processed_question)
@@ -3,23 +3,19 @@ import logging
 
 from VASSAR_API.api import VASSARClient
 from daphne_API.critic.critic import Critic
+from daphne_API.design_helpers import get_design
 from daphne_API.models import UserInformation
 
 logger = logging.getLogger('VASSAR')
 
 
-def general_call(design_id, designs, context: UserInformation):
+def general_call(design_id, context: UserInformation):
     port = context.eosscontext.vassar_port
     critic = Critic(context)
 
     try:
-        this_design = None
         num_design_id = int(design_id)
-
-        for design in designs:
-            if num_design_id == design.id:
-                this_design = design
-                break
+        this_design = get_design(context.eosscontext, num_design_id)
 
         if this_design is None:
             raise ValueError("Design id {} not found in the database".format(design_id))
@@ -59,24 +55,27 @@ def general_call(design_id, designs, context: UserInformation):
         return None
 
 
-def specific_call(design_id, agent, designs, context: UserInformation):
+def specific_call(design_id, agent, context: UserInformation):
     critic = Critic(context)
     try:
         result = []
         result_arr = []
         num_design_id = int(design_id[1:])
+        this_design = get_design(context.eosscontext, num_design_id)
+        if this_design is None:
+            raise ValueError("Design id {} not found in the database".format(design_id))
         if agent == 'expert':
             # Criticize architecture (based on rules)
-            result_arr = critic.expert_critic(designs[num_design_id])
+            result_arr = critic.expert_critic(this_design)
         elif agent == 'historian':
             # Criticize architecture (based on database)
-            result_arr = critic.historian_critic(designs[num_design_id])
+            result_arr = critic.historian_critic(this_design)
         elif agent == 'analyst':
             # Criticize architecture (based on database)
-            result_arr = critic.analyst_critic(designs[num_design_id])
+            result_arr = critic.analyst_critic(this_design)
         elif agent == 'explorer':
             # Criticize architecture (based on database)
-            result_arr = critic.explorer_critic(designs[num_design_id])
+            result_arr = critic.explorer_critic(this_design)
         # Send response
         return result_arr
 
@@ -1,13 +1,13 @@
-import json
 import logging
 from VASSAR_API.api import VASSARClient
 from daphne_API import problem_specific
+from daphne_API.design_helpers import get_design
 from daphne_API.models import UserInformation
 
 logger = logging.getLogger('VASSAR')
 
 
-def get_architecture_scores(design_id, designs, context: UserInformation):
+def get_architecture_scores(design_id, context: UserInformation):
     port = context.eosscontext.vassar_port
     client = VASSARClient(port)
 
@@ -16,7 +16,7 @@ def get_architecture_scores(design_id, designs, context: UserInformation):
         client.startConnection()
         num_design_id = int(design_id)
         scores = client.client.getArchitectureScoreExplanation(context.eosscontext.problem,
-                                                                   json.loads(designs[num_design_id].inputs))
+                                                                   get_design(context.eosscontext, num_design_id).inputs.tolist())
 
         # End the connection before return statement
         client.endConnection()
@@ -28,7 +28,7 @@ def get_architecture_scores(design_id, designs, context: UserInformation):
         return None
 
 
-def get_panel_scores(design_id, designs, panel, context: UserInformation):
+def get_panel_scores(design_id, panel, context: UserInformation):
     port = context.eosscontext.vassar_port
     client = VASSARClient(port)
 
@@ -49,7 +49,7 @@ def get_panel_scores(design_id, designs, panel, context: UserInformation):
 
         panel_code = stakeholders_to_excel[panel.lower()]
         panel_scores = client.client.getPanelScoreExplanation(context.eosscontext.problem,
-                                                              json.loads(designs[num_design_id].inputs),
+                                                              get_design(context.eosscontext, num_design_id).inputs.tolist(),
                                                               panel_code)
 
         # End the connection before return statement
@@ -62,7 +62,7 @@ def get_panel_scores(design_id, designs, panel, context: UserInformation):
         return None
 
 
-def get_objective_scores(design_id, designs, objective, context: UserInformation):
+def get_objective_scores(design_id, objective, context: UserInformation):
     port = context.eosscontext.vassar_port
     client = VASSARClient(port)
 
@@ -71,7 +71,7 @@ def get_objective_scores(design_id, designs, objective, context: UserInformation
         client.startConnection()
         num_design_id = int(design_id)
         objective_scores = client.client.getObjectiveScoreExplanation(context.eosscontext.problem,
-                                                                      json.loads(designs[num_design_id].inputs),
+                                                                      get_design(context.eosscontext, num_design_id).inputs.tolist(),
                                                                       objective)
 
         # End the connection before return statement
@@ -1,4 +1,3 @@
-import json
 import logging
 import sys
 import traceback
@@ -168,7 +167,7 @@ def apply_base_filter(filter_expression, design, context):
     arguments = expression.split("[")[1]
     arguments = arguments[:-1]
 
-    inputs = json.loads(design.inputs)
+    inputs = design.inputs.tolist()
 
     arg_split = arguments.split(";")
     orbit = arg_split[0]
@@ -0,0 +1,166 @@
+import operator
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+import Levenshtein as lev
+
+# Minimum similarity (exclusive) for a feature to be considered mentioned in the question
+CUTOFF = 0.75
+
+# Number of feature lists whose index is kept in memory
+CACHE_SIZE = 64
+
+
+def bigrams(text):
+    return [text[i:i+2] for i in range(len(text) - 1)]
+
+
+def window_ratio(text, feature):
+    """ Best ratio of the feature against every window of the question with the same length, and where it starts """
+    length_text = len(text)
+    length_feature = len(feature)
+    if length_feature > length_text:
+        return 0, -1
+    substrings = [text[i:i+length_feature].lower() for i in range(length_text-length_feature+1)]
+    ratios = [lev.ratio(substrings[i], feature.lower()) for i in range(length_text-length_feature+1)]
+    max_index, max_ratio = max(enumerate(ratios), key=operator.itemgetter(1))
+    return max_ratio, max_index
+
+
+def needs_full_scan(text):
+    # Lowercasing some characters changes the length of the text, or depends on the characters around them, so the
+    # windows of the lowercased text would not be the lowercased windows of the text
+    return len(text.lower()) != len(text) or 'Σ' in text
+
+
+class FuzzyIndex:
+    """
+    Character and bigram counts of a list of features, used to skip the features and question windows that cannot
+    reach the cutoff before computing any Levenshtein ratio.
+
+    Between two strings of the same length m, Levenshtein.ratio is LCS/m, so a window above the cutoff has more than
+    CUTOFF*m characters in common with the feature. Each of the other characters of the feature breaks at most two of
+    its bigrams and each of the other characters of the window at most one, so with a cutoff of 0.75 the window also
+    shares at least (m-1)/4 bigrams with the feature.
+    """
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.lowered = [feature.lower() for feature in self.features]
+        self.char_counts = [Counter(lowered) for lowered in self.lowered]
+        self.bigram_counts = [Counter(bigrams(lowered)) for lowered in self.lowered]
+        self.full_scan = [len(feature) == 0 or needs_full_scan(feature) for feature in self.features]
+
+        # Inverted lists from each bigram to the features containing it, and how many times
+        self.bigram_postings = defaultdict(list)
+        for feature_index, bigram_count in enumerate(self.bigram_counts):
+            for bigram, count in bigram_count.items():
+                self.bigram_postings[bigram].append((feature_index, count))
+
+    def match(self, text):
+        """ Same (feature, ratio, index) tuples, in the same order, as scanning every window of every feature """
+        if needs_full_scan(text):
+            ratio_ordered = [(feature,) + window_ratio(text, feature) for feature in self.features]
+            return sort_by_ratio(ratio_ordered)
+
+        lowered_text = text.lower()
+        shared_bigrams = [0]*len(self.features)
+        for bigram, count in Counter(bigrams(lowered_text)).items():
+            for feature_index, feature_count in self.bigram_postings.get(bigram, ()):
+                shared_bigrams[feature_index] += min(count, feature_count)
+
+        ratio_ordered = []
+        for feature_index, feature in enumerate(self.features):
+            if self.full_scan[feature_index]:
+                ratio, index = window_ratio(text, feature)
+            else:
+                length_feature = len(feature)
+                if length_feature > len(text) or 4*shared_bigrams[feature_index] < length_feature - 1:
+                    continue
+                ratio, index = self.best_window(feature_index, text, lowered_text)
+            if ratio > CUTOFF:
+                ratio_ordered.append((feature, ratio, index))
+        return sort_by_ratio(ratio_ordered)
+
+    def best_window(self, feature_index, text, lowered_text):
+        lowered_feature = self.lowered[feature_index]
+        feature_chars = self.char_counts[feature_index]
+        feature_bigrams = self.bigram_counts[feature_index]
+        length_feature = len(lowered_feature)
+
+        # Shared characters and bigrams of the current window, updated as it slides over the question
+        window_chars = Counter()
+        window_bigrams = Counter()
+        shared_chars = 0
+        shared_bigrams = 0
+        for char in lowered_text[:length_feature]:
+            if window_chars[char] < feature_chars[char]:
+                shared_chars += 1
+            window_chars[char] += 1
+        for bigram in bigrams(lowered_text[:length_feature]):
+            if window_bigrams[bigram] < feature_bigrams[bigram]:
+                shared_bigrams += 1
+            window_bigrams[bigram] += 1
+
+        max_ratio, max_index = 0, -1
+        for i in range(len(lowered_text) - length_feature + 1):
+            if i > 0:
+                old_char, new_char = lowered_text[i-1], lowered_text[i+length_feature-1]
+                window_chars[old_char] -= 1
+                if window_chars[old_char] < feature_chars[old_char]:
+                    shared_chars -= 1
+                if window_chars[new_char] < feature_chars[new_char]:
+                    shared_chars += 1
+                window_chars[new_char] += 1
+                if length_feature > 1:
+                    old_bigram, new_bigram = lowered_text[i-1:i+1], lowered_text[i+length_feature-2:i+length_feature]
+                    window_bigrams[old_bigram] -= 1
+                    if window_bigrams[old_bigram] < feature_bigrams[old_bigram]:
+                        shared_bigrams -= 1
+                    if window_bigrams[new_bigram] < feature_bigrams[new_bigram]:
+                        shared_bigrams += 1
+                    window_bigrams[new_bigram] += 1
+
+            if 4*shared_chars > 3*length_feature and 4*shared_bigrams >= length_feature - 1:
+                ratio = lev.ratio(text[i:i+length_feature].lower(), lowered_feature)
+                if ratio > max_ratio:
+                    max_ratio, max_index = ratio, i
+        return max_ratio, max_index
+
+
+def sort_by_ratio(ratio_ordered):
+    # Keep the longest string by default
+    ratio_ordered = sorted(ratio_ordered, key=lambda ratio_info: -len(ratio_info[0]))
+    ratio_ordered = sorted(ratio_ordered, key=lambda ratio_info: -ratio_info[1])
+    ratio_ordered = [ratio_info for ratio_info in ratio_ordered if ratio_info[1] > CUTOFF]
+    return ratio_ordered
+
+
+class FuzzyIndexCache:
+    """ Keeps the index of the most recently used feature lists, so each list is only indexed once """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, features):
+        key = tuple(features)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        index = FuzzyIndex(key)
+        with self._lock:
+            self._indexes[key] = index
+            if len(self._indexes) > self.size:
+                self._indexes.popitem(last=False)
+        return index
+
+
+indexes = FuzzyIndexCache()
+
+
+def match(text, features):
+    return indexes.get(features).match(text)
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+import daphne_API.historian.models as earth_models
+if 'EDL' in settings.ACTIVE_MODULES:
+    import daphne_API.edl.model as edl_models
+
+logger = logging.getLogger('debugging')
+
+# Number of seconds an entity vocabulary is kept before it is loaded again from its database
+TTL = 3600
+
+
+class Vocabulary:
+    """
+    The names of one kind of entity as stored in its database, plus their normalised version as used by the
+    parameter extractors. Both are loaded together and replaced together.
+    """
+
+    def __init__(self, names, normalise):
+        self.names = names
+        self.features = [normalise(name) for name in names]
+        self.loaded_at = time.monotonic()
+
+
+class Gazetteer:
+    """
+    In-memory copy of the (nearly static) entity names in the CEOS and EDL databases. Each vocabulary is loaded the
+    first time it is used and reloaded once it is older than the TTL, or after it is invalidated.
+    """
+
+    def __init__(self, ttl=TTL):
+        self.ttl = ttl
+        self._loaders = {}
+        self._vocabularies = {}
+        self._lock = threading.Lock()
+        # Increased every time a vocabulary is loaded, so anything built from them knows when to rebuild
+        self.version = 0
+
+    def register(self, vocabulary_name, loader, normalise):
+        self._loaders[vocabulary_name] = (loader, normalise)
+
+    def vocabulary_names(self):
+        return list(self._loaders.keys())
+
+    def get(self, vocabulary_name):
+        vocabulary = self._vocabularies.get(vocabulary_name)
+        if vocabulary is not None and time.monotonic() - vocabulary.loaded_at < self.ttl:
+            return vocabulary
+
+        with self._lock:
+            vocabulary = self._vocabularies.get(vocabulary_name)
+            if vocabulary is None or time.monotonic() - vocabulary.loaded_at >= self.ttl:
+                loader, normalise = self._loaders[vocabulary_name]
+                logger.info("Loading the " + vocabulary_name + " gazetteer")
+                vocabulary = Vocabulary(loader(), normalise)
+                self._vocabularies[vocabulary_name] = vocabulary
+                self.version += 1
+        return vocabulary
+
+    def names(self, vocabulary_name):
+        """ The names as stored in the database, without surrounding whitespace """
+        return self.get(vocabulary_name).names
+
+    def features(self, vocabulary_name):
+        """ The names normalised the way the parameter extractors compare them with the question """
+        return self.get(vocabulary_name).features
+
+    def invalidate(self, vocabulary_name=None):
+        """ Forget one (or every) vocabulary, so it is loaded again on its next use """
+        with self._lock:
+            if vocabulary_name is None:
+                self._vocabularies.clear()
+            else:
+                self._vocabularies.pop(vocabulary_name, None)
+
+
+def load_missions():
+    session = earth_models.get_session()
+    return [name.strip() for name, in session.query(earth_models.Mission.name)]
+
+
+def load_measurements():
+    session = earth_models.get_session()
+    return [name.strip() for name, in session.query(earth_models.Measurement.name)]
+
+
+def load_instrument_types():
+    session = earth_models.get_session()
+    return [name.strip() for name, in session.query(earth_models.InstrumentType.name)]
+
+
+def load_agencies():
+    session = earth_models.get_session()
+    return [name.strip() for name, in session.query(earth_models.Agency.name)]
+
+
+def load_edl_missions():
+    session = edl_models.get_session()
+    return [name.strip() for name, in session.query(edl_models.Mission.name)]
+
+
+def normalise_with_space(name):
+    # A space in front of the name so it only matches from the start of a word
+    return ' ' + name.lower()
+
+
+def normalise(name):
+    return name.lower()
+
+
+gazetteer = Gazetteer()
+gazetteer.register('missions', load_missions, normalise_with_space)
+gazetteer.register('measurements', load_measurements, normalise)
+gazetteer.register('instrument_types', load_instrument_types, normalise)
+gazetteer.register('agencies', load_agencies, normalise_with_space)
+if 'EDL' in settings.ACTIVE_MODULES:
+    gazetteer.register('edl_missions', load_edl_missions, normalise)
@@ -1,22 +1,36 @@
 # -*- coding: utf-8 -*-
+import logging
 
 from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, Time, Enum, ForeignKey, Table, \
-    CheckConstraint
+    CheckConstraint, Index, func, select
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.engine.url import URL
 
 import daphne_brain.settings
+from daphne_API import answer_cache
+from daphne_API.database_pool import PooledDatabase
+
+logger = logging.getLogger('debugging')
 
 DeclarativeBase = declarative_base()
 
+database = PooledDatabase('historian', daphne_brain.settings.ALCHEMY_DATABASE, daphne_brain.settings.ALCHEMY_POOL)
+
 
 def db_connect():
     """
     Performs database connection using database settings from settings.py.
-    Returns sqlalchemy engine instance
+    Returns the sqlalchemy engine instance shared by the whole process
     """
-    return create_engine(URL(**daphne_brain.settings.ALCHEMY_DATABASE))
+    return database.engine()
+
+
+def get_session():
+    """
+    Returns the sqlalchemy session of the current thread
+    """
+    return database.session()
 
 
 def create_tables(engine):
@@ -230,3 +244,125 @@ class MeasurementMostCommonOrbit(DeclarativeBase):
     id = Column(Integer, primary_key=True)
     measurement = Column('measurement', String)
     orbit = Column('orbit', String, nullable=True)
+
+
+class MissionMeasurement(DeclarativeBase):
+    """
+    Sqlalchemy model of the materialised mission x instrument x measurement x operating agency table, which answers
+    the 4000 series questions without joining the CEOS tables. Rebuilt by refresh_mission_measurements
+    """
+    __tablename__ = 'ceos_mission_measurements'
+    __table_args__ = (
+        Index('ix_ceos_mission_measurements_measurement_name', 'measurement_name'),
+        Index('ix_ceos_mission_measurements_agency_name', 'agency_name'),
+        Index('ix_ceos_mission_measurements_launch_date', 'launch_date'),
+        Index('ix_ceos_mission_measurements_eol_date', 'eol_date'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    mission_id = Column('mission_id', Integer)
+    mission_name = Column('mission_name', String)
+    mission_status = Column('mission_status', String)
+    launch_date = Column('launch_date', DateTime, nullable=True)
+    eol_date = Column('eol_date', DateTime, nullable=True)
+    instrument_id = Column('instrument_id', Integer)
+    instrument_name = Column('instrument_name', String)
+    measurement_id = Column('measurement_id', Integer)
+    measurement_name = Column('measurement_name', String)
+    # Missions without an operating agency keep a row with no agency
+    agency_id = Column('agency_id', Integer, nullable=True)
+    agency_name = Column('agency_name', String, nullable=True)
+
+
+# Key of the PostgreSQL advisory lock taken while rebuilding the MissionMeasurement table
+MISSION_MEASUREMENTS_LOCK = 4000
+
+
+def refresh_mission_measurements(engine):
+    """
+    Rebuild the MissionMeasurement table from the CEOS tables, and invalidate the cached historian answers in every
+    process. To be run every time the CEOS database is loaded.
+    Returns the number of rows of the table
+    """
+    table = MissionMeasurement.__table__
+    missions = Mission.__table__
+    instruments = Instrument.__table__
+    measurements = Measurement.__table__
+    agencies = Agency.__table__
+    rows = select([missions.c.id, missions.c.name, missions.c.status, missions.c.launch_date, missions.c.eol_date,
+                   instruments.c.id, instruments.c.name, measurements.c.id, measurements.c.name, agencies.c.id,
+                   agencies.c.name]).select_from(
+        missions.join(instruments_in_mission_table, instruments_in_mission_table.c.mission_id == missions.c.id)
+        .join(instruments, instruments.c.id == instruments_in_mission_table.c.instrument_id)
+        .join(measurements_of_instrument_table, measurements_of_instrument_table.c.instrument_id == instruments.c.id)
+        .join(measurements, measurements.c.id == measurements_of_instrument_table.c.measurement_id)
+        .outerjoin(operators_table, operators_table.c.mission_id == missions.c.id)
+        .outerjoin(agencies, agencies.c.id == operators_table.c.agency_id))
+
+    table.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        if engine.dialect.name == 'postgresql':
+            # Workers filling the table at the same time would otherwise each insert every row
+            connection.execute(select([func.pg_advisory_xact_lock(MISSION_MEASUREMENTS_LOCK)]))
+        connection.execute(table.delete())
+        connection.execute(table.insert().from_select(
+            ['mission_id', 'mission_name', 'mission_status', 'launch_date', 'eol_date', 'instrument_id',
+             'instrument_name', 'measurement_id', 'measurement_name', 'agency_id', 'agency_name'], rows))
+        count = connection.execute(select([func.count()]).select_from(table)).scalar()
+    answer_cache.cache.invalidate("historian")
+    return count
+
+
+def mission_measurements_filled(engine):
+    """ Whether the MissionMeasurement table exists and has rows """
+    table = MissionMeasurement.__table__
+    return table.exists(engine) and engine.execute(select([table.c.id]).limit(1)).first() is not None
+
+
+def check_mission_measurements():
+    """
+    Warn when the MissionMeasurement table is missing or empty, as the 4000 series questions read it and would get
+    empty answers until refresh_historian_aggregates is run
+    """
+    try:
+        if not mission_measurements_filled(db_connect()):
+            logger.warning("The " + MissionMeasurement.__tablename__ + " table is empty, run manage.py "
+                           "refresh_historian_aggregates after loading the CEOS database")
+    except DBAPIError:
+        logger.exception("Could not check the " + MissionMeasurement.__tablename__ + " table")
+
+
+def search_indexed_columns():
+    """ Columns the command types filter with ilike('%...%') """
+    attributes = [Agency.name, Measurement.name, Mission.name, Instrument.technology, InstrumentType.name,
+                  TechTypeMostCommonOrbit.techtype, MeasurementMostCommonOrbit.measurement,
+                  MissionMeasurement.measurement_name, MissionMeasurement.agency_name]
+    return [attribute.property.columns[0] for attribute in attributes]
+
+
+def create_search_indexes(engine):
+    """
+    Create pg_trgm GIN indexes on the columns searched with ilike('%...%'), which PostgreSQL then uses for those
+    filters instead of scanning the whole table. Databases that are not PostgreSQL, or where the extension cannot be
+    created, keep answering with sequential scans.
+    Returns the names of the indexes, or an empty list if they could not be created
+    """
+    if engine.dialect.name != 'postgresql':
+        logger.warning("Trigram indexes need PostgreSQL, the historian substring filters will scan the tables")
+        return []
+    try:
+        with engine.begin() as connection:
+            connection.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DBAPIError:
+        logger.exception("Could not create the pg_trgm extension, the historian substring filters will scan the "
+                         "tables")
+        return []
+
+    index_names = []
+    with engine.begin() as connection:
+        for column in search_indexed_columns():
+            index_name = "ix_" + column.table.name + "_" + column.name + "_trgm"
+            connection.execute("CREATE INDEX IF NOT EXISTS " + index_name + " ON " + column.table.name +
+                               " USING gin (" + column.name + " gin_trgm_ops)")
+            index_names.append(index_name)
+    return index_names
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+logger = logging.getLogger('debugging')
+
+# Upper bounds (in milliseconds) of the histogram buckets, the last one takes everything slower
+BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float('inf')]
+
+# Questions slower than this many seconds are kept as samples, with the time of each of their stages
+SLOW_THRESHOLD = 5
+SLOW_SAMPLES = 50
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, milliseconds):
+        for index, bound in enumerate(BUCKETS):
+            if milliseconds <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def percentile(self, fraction):
+        """ Upper bound of the bucket holding the percentile, or the maximum if that is lower """
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count > 0 else 0.,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+            "buckets": {str(bound): count for bound, count in zip(BUCKETS, self.counts) if count > 0}
+        }
+
+
+class Trace:
+    """ The stages of answering a question with one skill. They are recorded once the command type is known """
+
+    def __init__(self, command, module):
+        self.command = command
+        self.module = module
+        self.command_type = None
+        self.spans = OrderedDict()
+
+    @contextmanager
+    def span(self, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.spans[stage] = self.spans.get(stage, 0.) + (time.monotonic() - start) * 1000
+
+
+class LatencyStats:
+    """ Histograms of the time taken by each stage of the QA pipeline, per module and command type """
+
+    def __init__(self):
+        self._histograms = {}
+        self._slow_samples = deque(maxlen=SLOW_SAMPLES)
+        self._lock = threading.Lock()
+
+    def add(self, stage, module, command_type, milliseconds):
+        key = (stage, module, command_type)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.add(milliseconds)
+
+    def add_trace(self, trace: Trace, total):
+        command_type = str(trace.command_type) if trace.command_type is not None else None
+        for stage, milliseconds in trace.spans.items():
+            self.add(stage, trace.module, command_type, milliseconds)
+        self.add("total", trace.module, command_type, total)
+
+        stages = ", ".join(stage + " " + "{:.1f}".format(milliseconds) + "ms"
+                           for stage, milliseconds in trace.spans.items())
+        message = trace.module + " " + str(command_type) + " took " + "{:.1f}".format(total) + "ms (" + stages + ")"
+        if total >= SLOW_THRESHOLD * 1000:
+            logger.warning("Slow question: " + message + ": " + trace.command)
+            with self._lock:
+                self._slow_samples.append({
+                    "time": time.time(),
+                    "command": trace.command,
+                    "module": trace.module,
+                    "command_type": command_type,
+                    "total": total,
+                    "stages": dict(trace.spans)
+                })
+        else:
+            logger.info(message)
+
+    def report(self):
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda item: [str(part) for part in item[0]])
+            stages = [dict(stage=stage, module=module, command_type=command_type, **histogram.summary())
+                      for (stage, module, command_type), histogram in histograms]
+            slow_samples = list(self._slow_samples)
+        return {
+            "stages": stages,
+            "slow_questions": slow_samples
+        }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._slow_samples.clear()
+
+
+stats = LatencyStats()
+
+
+@contextmanager
+def trace(command, module):
+    """ Time the stages of answering a question with a skill, see Trace.span """
+    question_trace = Trace(command, module)
+    start = time.monotonic()
+    try:
+        yield question_trace
+    finally:
+        stats.add_trace(question_trace, (time.monotonic() - start) * 1000)
+
+
+@contextmanager
+def span(stage, module=None):
+    """ Time a stage that is not part of a skill, such as parsing with spaCy or the general classifier """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        stats.add(stage, module, None, (time.monotonic() - start) * 1000)
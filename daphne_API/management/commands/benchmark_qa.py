@@ -0,0 +1,67 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from config.loader import ConfigurationLoader
+from daphne_API import answer_cache, benchmark
+
+config = ConfigurationLoader().load()
+
+
+class Command(BaseCommand):
+    help = 'Answers a corpus of questions built from the command templates and reports throughput and latencies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=200, help='Number of questions in the corpus')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the corpus and the designs')
+        parser.add_argument('--lists', nargs='+', choices=sorted(benchmark.COMMAND_LISTS),
+                            help='Only use the templates of these command lists')
+        parser.add_argument('--problem', default='SMAP')
+        parser.add_argument('--designs', type=int, default=20, help='Number of designs of the benchmark user')
+        parser.add_argument('--warmup', type=int, default=10, help='Questions answered before measuring')
+        parser.add_argument('--corpus', help='Answer the questions saved in this file instead of building them')
+        parser.add_argument('--save-corpus', help='Save the questions to this file, to answer them again later')
+        parser.add_argument('--no-stubs', action='store_true',
+                            help='Use the VASSAR and data mining servers already running instead of the stubs')
+        parser.add_argument('--vassar-port', type=int, default=9090)
+        parser.add_argument('--stub-delay', type=float, default=0.,
+                            help='Seconds the stub servers wait before answering')
+        parser.add_argument('--no-answer-cache', action='store_true',
+                            help='Do not keep any answer in the answer cache')
+        parser.add_argument('--output', help='Save the results to this file, to use them as a baseline')
+        parser.add_argument('--baseline', help='Compare the results with the ones saved in this file')
+
+    def handle(self, *args, **options):
+        try:
+            benchmark.check_database()
+        except ImproperlyConfigured as error:
+            raise CommandError(str(error))
+        if not options['no_stubs']:
+            benchmark.start_stub_servers(options['vassar_port'], config['data-mining']['port'], options['stub_delay'])
+
+        context, designs = benchmark.prepare_context(options['problem'], options['vassar_port'], options['designs'],
+                                                     options['seed'])
+        if options['corpus'] is not None:
+            with open(options['corpus'], 'r') as file:
+                corpus = json.load(file)
+        else:
+            corpus = benchmark.build_corpus(context, designs, options['size'], options['seed'], options['lists'])
+        if options['save_corpus'] is not None:
+            with open(options['save_corpus'], 'w') as file:
+                json.dump(corpus, file, indent=2)
+
+        answer_cache.cache.invalidate()
+        if options['no_answer_cache']:
+            answer_cache.cache.size = 0
+        results = benchmark.run_benchmark(corpus, context, options['warmup'])
+        results["options"] = {key: options[key] for key in ['size', 'seed', 'lists', 'problem', 'designs', 'warmup',
+                                                            'corpus', 'no_stubs', 'stub_delay', 'no_answer_cache']}
+
+        if options['output'] is not None:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+        if options['baseline'] is not None:
+            with open(options['baseline'], 'r') as file:
+                results["comparison"] = benchmark.compare(results, json.load(file))
+        self.stdout.write(json.dumps(results, indent=2))
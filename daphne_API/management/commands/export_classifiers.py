@@ -0,0 +1,64 @@
+import json
+import os
+import re
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from daphne_API import classifier_registry, command_lists, command_processing, data_helpers
+from daphne_API.numpy_classifier import ARTIFACT_NAME, NumpyClassifier, export_classifier
+from daphne_brain.nlp_object import nlp
+
+
+def template_questions():
+    """ The questions of the command lists, with the names of their parameters in place of real values """
+    templates = command_lists.general_commands + command_lists.analyst_commands + command_lists.critic_commands + \
+        command_lists.historian_commands
+    return [re.sub(r'\$\{(\w+)\}', lambda match: match.group(1).replace('_', ' '), re.sub(r'[\[\]]', '', template))
+            for command_type, template in templates]
+
+
+class Command(BaseCommand):
+    help = 'Exports the question classifiers to .npz files for the NumPy engine and checks they give the same logits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', help='Modules to export, all of them by default')
+        parser.add_argument('--questions', help='JSON file with a list of questions to check the exports with')
+        parser.add_argument('--tolerance', type=float, default=1e-4,
+                            help='Largest difference allowed between the logits of both engines')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or ["general"] + command_processing.command_options
+        if options['questions'] is not None:
+            with open(options['questions'], 'r') as file:
+                questions = json.load(file)
+        else:
+            questions = template_questions()
+        cleaned_questions = [data_helpers.clean_str(doc) for doc in nlp.pipe([question.strip().lower()
+                                                                               for question in questions])]
+
+        failed = []
+        for module_name in modules:
+            module_path = os.path.join(classifier_registry.MODELS_PATH, module_name)
+            if not os.path.exists(os.path.join(module_path, "checkpoint")):
+                self.stdout.write(module_name + ': no checkpoint, skipped')
+                continue
+            classifier = classifier_registry.registry.load_tensorflow(module_name)
+            artifact_path = os.path.join(module_path, ARTIFACT_NAME)
+            export_classifier(classifier, artifact_path)
+
+            # Parity with the TensorFlow graph
+            expected = classifier.logits(cleaned_questions)
+            obtained = NumpyClassifier(module_name, artifact_path).logits(cleaned_questions)
+            difference = float(np.abs(expected - obtained).max())
+            same_labels = bool((expected.argmax(axis=1) == obtained.argmax(axis=1)).all())
+            self.stdout.write(module_name + ': exported to ' + artifact_path + ' (' +
+                              str(os.path.getsize(artifact_path)) + ' bytes), largest logit difference ' +
+                              '{:.2e}'.format(difference) + (', same labels' if same_labels else ', DIFFERENT labels'))
+            if difference > options['tolerance'] or not same_labels:
+                os.remove(artifact_path)
+                failed.append(module_name)
+
+        if len(failed) > 0:
+            raise CommandError('The NumPy engine does not match TensorFlow for ' + ', '.join(failed) +
+                               ', their exports were removed')
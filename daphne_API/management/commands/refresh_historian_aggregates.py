@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+import daphne_API.historian.models as models
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialised historian tables and their search indexes, to be run every time the CEOS ' \
+           'database is loaded'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-search-indexes', action='store_true',
+                            help='Do not create the trigram indexes used by the substring filters')
+        parser.add_argument('--if-empty', action='store_true',
+                            help='Only rebuild the tables if they are missing or empty, e.g. on every deploy')
+
+    def handle(self, *args, **options):
+        engine = models.db_connect()
+        if options['if_empty'] and models.mission_measurements_filled(engine):
+            self.stdout.write('ceos_mission_measurements already filled, nothing to do')
+            return
+        rows = models.refresh_mission_measurements(engine)
+        self.stdout.write('ceos_mission_measurements rebuilt with ' + str(rows) + ' rows')
+        if not options['skip_search_indexes']:
+            index_names = models.create_search_indexes(engine)
+            if len(index_names) > 0:
+                self.stdout.write('Trigram indexes: ' + ', '.join(index_names))
+            else:
+                self.stdout.write('No trigram indexes, substring filters will scan the tables')
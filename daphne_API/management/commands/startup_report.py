@@ -0,0 +1,20 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from daphne_API import classifier_registry, command_processing
+from daphne_brain import startup
+from daphne_brain.nlp_object import nlp
+
+
+class Command(BaseCommand):
+    help = 'Loads the NLP and ML components the way a first question does and reports how long each step took'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-classifiers', action='store_true', help='Only load spaCy')
+
+    def handle(self, *args, **options):
+        nlp("what is the startup time of daphne")
+        if not options['skip_classifiers']:
+            classifier_registry.registry.warm_up(["general"] + command_processing.command_options)
+        self.stdout.write(json.dumps(startup.report(), indent=2))
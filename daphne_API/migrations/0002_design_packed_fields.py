@@ -0,0 +1,104 @@
+import json
+import struct
+
+import numpy as np
+from django.db import migrations, models
+
+# A copy of the encoding of daphne_API.design_encoding when this migration was written, so later changes to it
+# don't change what this migration does
+JSON = 0
+BITS = 1
+INT8 = 2
+INT16 = 3
+INT32 = 4
+FLOAT64 = 5
+
+DTYPES = {
+    INT8: np.dtype('<i1'),
+    INT16: np.dtype('<i2'),
+    INT32: np.dtype('<i4'),
+    FLOAT64: np.dtype('<f8')
+}
+
+BITS_HEADER = struct.Struct('<BI')
+
+
+def pack(values):
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = np.zeros((0, 0))
+    if array.dtype == np.bool_ and array.ndim == 1:
+        return BITS_HEADER.pack(BITS, len(array)) + np.packbits(array).tobytes()
+    if array.dtype.kind in 'iu' and array.ndim == 1:
+        for code in [INT8, INT16, INT32]:
+            limits = np.iinfo(DTYPES[code])
+            if len(array) == 0 or (limits.min <= array.min() and array.max() <= limits.max):
+                return bytes([code]) + array.astype(DTYPES[code]).tobytes()
+    if array.dtype.kind in 'iuf' and array.ndim == 1:
+        return bytes([FLOAT64]) + array.astype(DTYPES[FLOAT64]).tobytes()
+    return bytes([JSON]) + json.dumps(values).encode('utf-8')
+
+
+def pack_outputs(values):
+    return pack(np.asarray(values, dtype=np.float64))
+
+
+def unpack_to_list(packed):
+    packed = bytes(packed)
+    if len(packed) == 0:
+        return []
+    if packed[0] == BITS:
+        length = BITS_HEADER.unpack_from(packed)[1]
+        return np.unpackbits(np.frombuffer(packed, dtype=np.uint8, offset=BITS_HEADER.size))[:length]\
+            .astype(np.bool_).tolist()
+    if packed[0] in DTYPES:
+        return np.frombuffer(packed, dtype=DTYPES[packed[0]], offset=1).tolist()
+    return json.loads(packed[1:].decode('utf-8'))
+
+
+def pack_designs(apps, schema_editor):
+    Design = apps.get_model('daphne_API', 'Design')
+    for design in Design.objects.only('design_id', 'inputs', 'outputs').iterator():
+        Design.objects.filter(design_id=design.design_id).update(
+            packed_inputs=pack(json.loads(design.inputs)),
+            packed_outputs=pack_outputs(json.loads(design.outputs) if design.outputs else []))
+
+
+def unpack_designs(apps, schema_editor):
+    Design = apps.get_model('daphne_API', 'Design')
+    for design in Design.objects.only('design_id', 'packed_inputs', 'packed_outputs').iterator():
+        Design.objects.filter(design_id=design.design_id).update(
+            inputs=json.dumps(unpack_to_list(design.packed_inputs)),
+            outputs=json.dumps(unpack_to_list(design.packed_outputs)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('daphne_API', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='design',
+            name='packed_inputs',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='design',
+            name='packed_outputs',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+        migrations.RunPython(pack_designs, unpack_designs),
+        migrations.RemoveField(
+            model_name='design',
+            name='inputs',
+        ),
+        migrations.RemoveField(
+            model_name='design',
+            name='outputs',
+        ),
+    ]
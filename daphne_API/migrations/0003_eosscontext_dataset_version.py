@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('daphne_API', '0002_design_packed_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eosscontext',
+            name='dataset_version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
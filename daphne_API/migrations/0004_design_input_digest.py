@@ -0,0 +1,59 @@
+import hashlib
+from collections import OrderedDict
+
+from django.db import migrations, models
+
+
+def digest(packed):
+    # Same digest as daphne_API.design_encoding.digest when this migration was written
+    return hashlib.blake2b(bytes(packed), digest_size=16).hexdigest()
+
+
+def compute_digests(apps, schema_editor):
+    """
+    Store the digest of the inputs of every design. The unique constraints added next need every dataset and queue to
+    have distinct inputs, so if any doesn't the migration stops and lists the designs to be resolved by hand first
+    """
+    Design = apps.get_model('daphne_API', 'Design')
+    groups = OrderedDict()
+    for design in Design.objects.order_by('design_id').only('design_id', 'id', 'eosscontext_id', 'activecontext_id',
+                                                            'packed_inputs').iterator():
+        input_digest = digest(design.packed_inputs)
+        Design.objects.filter(design_id=design.design_id).update(input_digest=input_digest)
+        ids = (design.design_id, design.id)
+        if design.eosscontext_id is not None:
+            groups.setdefault(('dataset of EOSSContext', design.eosscontext_id, input_digest), []).append(ids)
+        if design.activecontext_id is not None:
+            groups.setdefault(('queue of ActiveContext', design.activecontext_id, input_digest), []).append(ids)
+
+    duplicates = [(owner, owner_id, designs) for (owner, owner_id, input_digest), designs in groups.items()
+                  if len(designs) > 1]
+    if len(duplicates) > 0:
+        report = ['The ' + owner + ' ' + str(owner_id) + ' has designs with the same inputs (design_id, id): ' +
+                  ', '.join(str(ids) for ids in designs)
+                  for owner, owner_id, designs in duplicates]
+        raise RuntimeError('Delete or merge the designs repeating the inputs of another one before migrating, '
+                           'a dataset or queue can only have one design with the same inputs.\n' + '\n'.join(report))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('daphne_API', '0003_eosscontext_dataset_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='design',
+            name='input_digest',
+            field=models.CharField(default='', max_length=32),
+            preserve_default=False,
+        ),
+        # Undone by removing the field
+        migrations.RunPython(compute_digests, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='design',
+            unique_together={('eosscontext', 'activecontext', 'id'), ('eosscontext', 'input_digest'),
+                             ('activecontext', 'input_digest')},
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('daphne_API', '0004_design_input_digest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='design',
+            index=models.Index(fields=['eosscontext', 'id'], name='daphne_api_design_ctx_id_idx'),
+        ),
+    ]
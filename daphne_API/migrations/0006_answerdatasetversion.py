@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('daphne_API', '0005_design_eosscontext_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerDatasetVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth.models import User
 from django.contrib.sessions.models import Session
 from django.db import models
 
+from daphne_API import design_encoding
+
 
 # General user information class
 class UserInformation(models.Model):
@@ -39,6 +41,9 @@ class EOSSContext(models.Model):
     # Counter for manually added designs
     added_archs_count = models.IntegerField()
 
+    # Bumped every time designs are added to or removed from the dataset, see dataset_cache
+    dataset_version = models.IntegerField(default=0)
+
     vassar_port = models.IntegerField()
 
 
@@ -71,12 +76,44 @@ class Design(models.Model):
     activecontext = models.ForeignKey(ActiveContext, on_delete=models.CASCADE, null=True)
 
     id = models.IntegerField()
-    inputs = models.TextField()
-    outputs = models.TextField()
+    # Packed with design_encoding, read and write them through the inputs and outputs properties
+    packed_inputs = models.BinaryField()
+    packed_outputs = models.BinaryField()
+    # Digest of packed_inputs, so finding a design with the same inputs is an index lookup
+    input_digest = models.CharField(max_length=32)
 
     # Special restrictions
     class Meta:
-        unique_together = ("eosscontext", "activecontext", "id")
+        unique_together = (("eosscontext", "activecontext", "id"), ("eosscontext", "input_digest"),
+                           ("activecontext", "input_digest"))
+        indexes = [models.Index(fields=["eosscontext", "id"], name="daphne_api_design_ctx_id_idx")]
+
+    def _unpacked(self, field_name):
+        # The array is kept until the field changes, so reading the property again doesn't unpack it again
+        packed = getattr(self, field_name)
+        cache = self.__dict__.setdefault('_unpacked_cache', {})
+        if field_name not in cache or cache[field_name][0] is not packed:
+            cache[field_name] = (packed, design_encoding.unpack(packed))
+        return cache[field_name][1]
+
+    @property
+    def inputs(self):
+        """ A read-only NumPy array: bools for binary problems, integers for discrete ones """
+        return self._unpacked('packed_inputs')
+
+    @inputs.setter
+    def inputs(self, values):
+        self.packed_inputs = design_encoding.pack(values)
+        self.input_digest = design_encoding.digest(self.packed_inputs)
+
+    @property
+    def outputs(self):
+        """ A read-only NumPy array of floats """
+        return self._unpacked('packed_outputs')
+
+    @outputs.setter
+    def outputs(self, values):
+        self.packed_outputs = design_encoding.pack_outputs(values)
 
 
 # An answer from Daphne
@@ -87,6 +124,12 @@ class Answer(models.Model):
     visual_answer = models.TextField()
 
 
+# Version of a dataset the cached answers come from, kept in the database so every process sees it (see answer_cache)
+class AnswerDatasetVersion(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    version = models.IntegerField(default=0)
+
+
 # Experiment Context (to perform experiments with human subjects and Daphne)
 class ExperimentContext(models.Model):
     eosscontext = models.OneToOneField(EOSSContext, on_delete=models.CASCADE)
@@ -0,0 +1,125 @@
+import re
+
+import numpy as np
+
+ARTIFACT_NAME = "classifier.npz"
+
+# Same tokenizer as tf.contrib.learn's VocabularyProcessor, which the classifiers were trained with
+TOKENIZER_RE = re.compile(r"[A-Z]{2,}(?![a-z])|[A-Z][a-z]+(?=[A-Z])|[\'\w\-]+", re.UNICODE)
+
+
+class NotExportableError(Exception):
+    pass
+
+
+def find_upstream_op(tensor, op_type, accept=None):
+    """ The closest op of op_type (for which accept is true) that tensor depends on, looking backwards in the graph """
+    pending = [tensor.op]
+    seen = set()
+    while len(pending) > 0:
+        op = pending.pop(0)
+        if op.name in seen:
+            continue
+        seen.add(op.name)
+        if op.type == op_type and (accept is None or accept(op)):
+            return op
+        pending.extend(input_tensor.op for input_tensor in op.inputs)
+    raise NotExportableError("No " + op_type + " op before " + tensor.name)
+
+
+def export_classifier(classifier, artifact_path):
+    """
+    Save the weights of a text CNN restored by classifier_registry.LoadedClassifier, together with its vocabulary,
+    as a .npz file NumpyClassifier can run. The layers are found by walking the graph back from output/logits:
+    embedding lookup, one convolution + ReLU + max-pool over time per filter size, concatenation and dense layer.
+    """
+    graph = classifier.graph
+    session = classifier.session
+    vocab_processor = classifier.vocab_processor
+    if getattr(vocab_processor._tokenizer, '__name__', None) != 'tokenizer':
+        raise NotExportableError("The vocabulary of " + classifier.module_name + " uses a custom tokenizer")
+    sequence_length = vocab_processor.max_document_length
+
+    # Dense layer: logits = h_drop * W + b
+    logits_op = classifier.logits_tensor.op
+    while logits_op.type == "Identity":
+        logits_op = logits_op.inputs[0].op
+    if logits_op.type not in ("BiasAdd", "Add", "AddV2") or logits_op.inputs[0].op.type != "MatMul":
+        raise NotExportableError("Unexpected output layer in " + classifier.module_name)
+    matmul_op = logits_op.inputs[0].op
+    arrays = {
+        "dense_weights": matmul_op.inputs[1],
+        "dense_biases": logits_op.inputs[1]
+    }
+
+    # Embedding lookup of input_x
+    gather_ops = [op for op in graph.get_operations() if op.type in ("GatherV2", "Gather", "ResourceGather")
+                  and classifier.input_x.name in [tensor.name for tensor in op.inputs]]
+    if len(gather_ops) != 1:
+        raise NotExportableError("Could not find the embedding lookup of " + classifier.module_name)
+    arrays["embedding"] = gather_ops[0].inputs[0]
+
+    # Convolutions, in the same order as they are concatenated
+    concat_op = find_upstream_op(matmul_op.inputs[0], "ConcatV2",
+                                 lambda op: all(tensor.op.type == "MaxPool" for tensor in op.inputs[:-1]))
+    filter_sizes = []
+    for index, pooled in enumerate(concat_op.inputs[:-1]):
+        pool_op = find_upstream_op(pooled, "MaxPool")
+        conv_op = find_upstream_op(pool_op.outputs[0], "Conv2D")
+        bias_op = find_upstream_op(pool_op.outputs[0], "BiasAdd")
+        filter_size = int(conv_op.inputs[1].shape[0])
+        if conv_op.get_attr("padding") != b"VALID" or list(conv_op.get_attr("strides")) != [1, 1, 1, 1] \
+                or list(pool_op.get_attr("ksize")) != [1, sequence_length - filter_size + 1, 1, 1]:
+            raise NotExportableError("Unexpected convolution " + conv_op.name + " in " + classifier.module_name)
+        filter_sizes.append(filter_size)
+        arrays["conv_weights_" + str(index)] = conv_op.inputs[1]
+        arrays["conv_biases_" + str(index)] = bias_op.inputs[1]
+
+    values = session.run(arrays, {classifier.dropout_keep_prob: 1.0})
+    mapping = vocab_processor.vocabulary_._mapping
+    vocabulary = sorted(mapping, key=mapping.get)
+    np.savez_compressed(artifact_path,
+                        vocabulary=np.array(vocabulary, dtype=np.str_),
+                        sequence_length=np.array(sequence_length),
+                        number_of_convolutions=np.array(len(filter_sizes)),
+                        **{name: np.asarray(value, dtype=np.float32) for name, value in values.items()})
+
+
+class NumpyClassifier:
+    """ A question classifier exported with export_classifier, evaluated with NumPy alone """
+
+    def __init__(self, module_name, artifact_path):
+        self.module_name = module_name
+        with np.load(artifact_path) as artifact:
+            self.vocabulary = {word: index for index, word in enumerate(artifact["vocabulary"].tolist())}
+            self.sequence_length = int(artifact["sequence_length"])
+            self.embedding = artifact["embedding"]
+            self.convolutions = []
+            for index in range(int(artifact["number_of_convolutions"])):
+                weights = artifact["conv_weights_" + str(index)]
+                filter_size, embedding_size, _, num_filters = weights.shape
+                # [filter_size, embedding_size, 1, num_filters] -> [filter_size * embedding_size, num_filters]
+                self.convolutions.append((filter_size, weights.reshape(filter_size * embedding_size, num_filters),
+                                          artifact["conv_biases_" + str(index)]))
+            self.dense_weights = artifact["dense_weights"]
+            self.dense_biases = artifact["dense_biases"]
+
+    def transform(self, cleaned_questions):
+        """ Same word ids as VocabularyProcessor.transform: unknown words and padding are 0 """
+        word_ids = np.zeros((len(cleaned_questions), self.sequence_length), dtype=np.int64)
+        for row, question in enumerate(cleaned_questions):
+            for column, token in enumerate(TOKENIZER_RE.findall(question)[:self.sequence_length]):
+                word_ids[row, column] = self.vocabulary.get(token, 0)
+        return word_ids
+
+    def logits(self, cleaned_questions):
+        embedded = self.embedding[self.transform(cleaned_questions)]
+        pooled = []
+        for filter_size, weights, biases in self.convolutions:
+            positions = self.sequence_length - filter_size + 1
+            # Every window of filter_size words, flattened in the same order as the convolution weights
+            windows = np.concatenate([embedded[:, offset:offset + positions, :] for offset in range(filter_size)],
+                                     axis=2)
+            activations = np.maximum(np.matmul(windows, weights) + biases, 0)
+            pooled.append(activations.max(axis=1))
+        return np.matmul(np.concatenate(pooled, axis=1), self.dense_weights) + self.dense_biases
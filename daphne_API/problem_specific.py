@@ -1,4 +1,4 @@
-import pandas
+from daphne_API import resource_cache
 
 
 CC_ORBIT_DATASET = [
@@ -24,22 +24,7 @@ CC_INSTRUMENT_DATASET = [
     {"alias": "L", "name": "CNES_KaRIN", "type": "Radar altimeters", "technology": "Radar altimeter", "geometry": "Nadir-viewing", "wavebands": ["MW", "Ku-Band"]}]
 
 
-cc_capabilities_sheet = pandas.read_excel('../VASSAR_resources/problems/ClimateCentric/xls/Instrument Capability Definition.xls',
-                                       sheet_name='CHARACTERISTICS')
-
-cc_instrument_sheet = lambda vassar_instrument: pandas.read_excel('../VASSAR_resources/problems/ClimateCentric/xls/Instrument Capability Definition.xls',
-                                        sheet_name=vassar_instrument, header=None)
-
-cc_requirements_sheet = pandas.read_excel('../VASSAR_resources/problems/ClimateCentric/xls/Requirement Rules.xls',
-                                           sheet_name='Attributes')
-
-cc_instruments_sheet = pandas.read_excel('../VASSAR_resources/problems/ClimateCentric/xls/AttributeSet.xls', sheet_name='Instrument')
-cc_measurements_sheet = pandas.read_excel('../VASSAR_resources/problems/ClimateCentric/xls/AttributeSet.xls', sheet_name='Measurement')
-cc_param_names = []
-for row in cc_measurements_sheet.itertuples(index=True, name='Measurement'):
-    if row[2] == 'Parameter':
-        for i in range(6, len(row)):
-            cc_param_names.append(row[i])
+CC_XLS_PATH = '../VASSAR_resources/problems/ClimateCentric/xls/'
 
 cc_orbits_info = [
     "<b>Orbit name: Orbit information</b>",
@@ -94,23 +79,7 @@ SMAP_INSTRUMENT_DATASET = [
 ]
 
 
-smap_capabilities_sheet = pandas.read_excel('../VASSAR_resources/problems/SMAP/xls/Instrument Capability Definition.xls',
-                                            sheet_name='CHARACTERISTICS')
-
-smap_instrument_sheet = lambda vassar_instrument: pandas.read_excel('../VASSAR_resources/problems/SMAP/xls/Instrument Capability Definition.xls',
-                                                                    sheet_name=vassar_instrument, header=None)
-
-smap_requirements_sheet = pandas.read_excel('../VASSAR_resources/problems/SMAP/xls/Requirement Rules.xls',
-                                            sheet_name='Attributes')
-
-smap_instruments_sheet = pandas.read_excel('../VASSAR_resources/problems/SMAP/xls/AttributeSet.xls', sheet_name='Instrument')
-smap_measurements_sheet = pandas.read_excel('../VASSAR_resources/problems/SMAP/xls/AttributeSet.xls', sheet_name='Measurement')
-smap_param_names = []
-for row in smap_measurements_sheet.itertuples(index=True, name='Measurement'):
-    if row[2] == 'Parameter':
-        for i in range(6, len(row)):
-            smap_param_names.append(row[i])
-
+SMAP_XLS_PATH = '../VASSAR_resources/problems/SMAP/xls/'
 
 smap_orbits_info = [
     "<b>Orbit name: Orbit information</b>",
@@ -152,39 +121,59 @@ def get_instrument_dataset(problem):
         return SMAP_INSTRUMENT_DATASET
 
 
-def get_capabilities_sheet(problem):
+def get_xls_path(problem):
     if problem == "ClimateCentric":
-        return cc_capabilities_sheet
+        return CC_XLS_PATH
     if problem == "SMAP" or problem == "SMAP_JPL1" or problem == "SMAP_JPL2":
-        return smap_capabilities_sheet
+        return SMAP_XLS_PATH
+
+
+def get_capabilities_sheet(problem):
+    xls_path = get_xls_path(problem)
+    if xls_path is not None:
+        return resource_cache.read_excel(xls_path + 'Instrument Capability Definition.xls',
+                                         sheet_name='CHARACTERISTICS')
 
 
 def get_instrument_sheet(problem, instrument):
-    if problem == "ClimateCentric":
-        return cc_instrument_sheet(instrument)
-    if problem == "SMAP" or problem == "SMAP_JPL1" or problem == "SMAP_JPL2":
-        return smap_instrument_sheet(instrument)
+    xls_path = get_xls_path(problem)
+    if xls_path is not None:
+        return resource_cache.read_excel(xls_path + 'Instrument Capability Definition.xls',
+                                         sheet_name=instrument, header=None)
 
 
 def get_instruments_sheet(problem):
-    if problem == "ClimateCentric":
-        return cc_instruments_sheet
-    if problem == "SMAP" or problem == "SMAP_JPL1" or problem == "SMAP_JPL2":
-        return smap_instruments_sheet
+    xls_path = get_xls_path(problem)
+    if xls_path is not None:
+        return resource_cache.read_excel(xls_path + 'AttributeSet.xls', sheet_name='Instrument')
+
+
+def get_measurements_sheet(problem):
+    xls_path = get_xls_path(problem)
+    if xls_path is not None:
+        return resource_cache.read_excel(xls_path + 'AttributeSet.xls', sheet_name='Measurement')
 
 
 def get_requirements_sheet(problem):
-    if problem == "ClimateCentric":
-        return cc_requirements_sheet
-    if problem == "SMAP" or problem == "SMAP_JPL1" or problem == "SMAP_JPL2":
-        return smap_requirements_sheet
+    xls_path = get_xls_path(problem)
+    if xls_path is not None:
+        return resource_cache.read_excel(xls_path + 'Requirement Rules.xls', sheet_name='Attributes')
 
 
 def get_param_names(problem):
-    if problem == "ClimateCentric":
-        return cc_param_names
-    if problem == "SMAP" or problem == "SMAP_JPL1" or problem == "SMAP_JPL2":
-        return smap_param_names
+    xls_path = get_xls_path(problem)
+    if xls_path is not None:
+        return resource_cache.cache.derive(xls_path + 'AttributeSet.xls', 'param_names',
+                                           lambda: param_names_from_sheet(get_measurements_sheet(problem)))
+
+
+def param_names_from_sheet(measurements_sheet):
+    param_names = []
+    for row in measurements_sheet.itertuples(index=True, name='Measurement'):
+        if row[2] == 'Parameter':
+            for i in range(6, len(row)):
+                param_names.append(row[i])
+    return param_names
 
 
 def get_orbits_info(problem):
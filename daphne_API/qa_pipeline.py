@@ -1,21 +1,12 @@
 import datetime
-import json
-import os
-from string import Template
 
-import numpy as np
-import tensorflow as tf
 from django.conf import settings
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import or_
-from sqlalchemy import func
-from tensorflow.contrib import learn
-from daphne_API import data_helpers
+from daphne_API import classifier_registry, command_type_registry, data_helpers, dataset_cache, entity_tagger, \
+    query_plans
 
 import daphne_API.historian.models as models
 import daphne_API.data_extractors as extractors
 import daphne_API.data_processors as processors
-import daphne_API.runnable_functions as run_func
 from daphne_API.errors import ParameterMissingError
 from daphne_API.models import UserInformation
 
@@ -26,57 +17,20 @@ if 'EDL' in settings.ACTIVE_MODULES:
 def classify(question, module_name):
     cleaned_question = data_helpers.clean_str(question)
 
-    # Map data into vocabulary
-    vocab_path = os.path.join("./daphne_API/models/" + module_name + "/vocab")
-    vocab_processor = learn.preprocessing.VocabularyProcessor.restore(vocab_path)
-    x_test = np.array(list(vocab_processor.transform([cleaned_question])))
+    # Evaluate the question with the already loaded classifier for this module
+    result_logits = classifier_registry.registry.logits(module_name, [cleaned_question])
+    prediction = data_helpers.get_label_using_logits(result_logits, top_number=1)
 
-    print("\nEvaluating...\n")
+    return get_named_labels(module_name)[prediction[0][0]]
 
-    # Evaluation
-    # ==================================================
-    checkpoint_file = tf.train.latest_checkpoint("./daphne_API/models/" + module_name + "/")
-    graph = tf.Graph()
-    with graph.as_default():
-        session_conf = tf.ConfigProto(allow_soft_placement=True, log_device_placement=False)
-        sess = tf.Session(config=session_conf)
-        with sess.as_default():
-            # Load the saved meta graph and restore variables
-            saver = tf.train.import_meta_graph("{}.meta".format(checkpoint_file))
-            saver.restore(sess, checkpoint_file)
 
-            # Get the placeholders from the graph by name
-            input_x = graph.get_operation_by_name("input_x").outputs[0]
-            # input_y = graph.get_operation_by_name("input_y").outputs[0]
-            dropout_keep_prob = graph.get_operation_by_name("dropout_keep_prob").outputs[0]
-
-            # Tensors we want to evaluate
-            logits = graph.get_operation_by_name("output/logits").outputs[0]
-
-            # get the prediction
-            result_logits = sess.run(logits, {input_x: x_test, dropout_keep_prob: 1.0})
-            prediction = data_helpers.get_label_using_logits(result_logits, top_number=1)
-
-    named_labels = []
-    for filename in sorted(os.listdir("./daphne_API/command_types/" + module_name)):
-        specific_label = int(filename.split('.', 1)[0])
-        named_labels.append(specific_label)
-    return named_labels[prediction[0][0]]
+def get_named_labels(module_name):
+    """ The command type of each output of the module classifier """
+    return command_type_registry.registry.named_labels(module_name)
 
 
 def load_type_info(question_type, module_name):
-    with open('./daphne_API/command_types/' + module_name + '/' + str(question_type) + '.json', 'r') as file:
-        type_info = json.load(file)
-    information = {}
-    information["type"] = type_info["type"]
-    information["params"] = type_info["params"]
-    if type_info["type"] == "db_query":
-        information["query"] = type_info["query"]
-    elif type_info["type"] == "run_function":
-        information["function"] = type_info["function"]
-    information["voice_response"] = type_info["voice_response"]
-    information["visual_response"] = type_info["visual_response"]
-    return information
+    return command_type_registry.registry.get(module_name, question_type).information
 
 extract_function = {}
 extract_function["mission"] = extractors.extract_mission
@@ -139,9 +93,17 @@ def extract_data(processed_question, params, context: UserInformation):
                 number_of_features[param["type"]] += 1
             else:
                 number_of_features[param["type"]] = 1
+    # Exact mentions of known entities are found in a single pass, the fuzzy extractors only run for the types
+    # without enough of them
+    mentions = {}
+    if any(entity_tagger.is_tagged(type) for type in number_of_features):
+        mentions = entity_tagger.tag(processed_question, context, number_of_features.keys())
     # Try to extract the required number of parameters
     for type, num in number_of_features.items():
-        extracted_raw_data[type] = extract_function[type](processed_question, num, context)
+        if len(mentions.get(type, [])) >= num:
+            extracted_raw_data[type] = entity_tagger.exact_features(mentions[type], num)
+        else:
+            extracted_raw_data[type] = extract_function[type](processed_question, num, context)
     # For each parameter check if it's needed and apply postprocessing;
     for param in params:
         extracted_param = None
@@ -170,7 +132,7 @@ def extract_data(processed_question, params, context: UserInformation):
 def augment_data(data, context: UserInformation):
     data['now'] = datetime.datetime.utcnow()
 
-    data['designs'] = context.eosscontext.design_set.all()
+    data['designs'] = dataset_cache.cache.get(context.eosscontext)
 
     #if 'behavioral' in context:
     #    data['behavioral'] = context['behavioral']
@@ -180,81 +142,42 @@ def augment_data(data, context: UserInformation):
     return data
 
 
-def query(query, data):
-    engine = models.db_connect()
-    session = sessionmaker(bind=engine)()
-    if 'EDL' in settings.ACTIVE_MODULES:
-        edl_engine = edl_models.db_connect()
-        edl_session = sessionmaker(bind=edl_engine)()
-
-    def print_orbit(orbit):
-        text_orbit = ""
-        orbit_codes = {
-            "GEO": "geostationary",
-            "LEO": "low earth",
-            "HEO": "highly elliptical",
-            "SSO": "sun-synchronous",
-            "Eq": "equatorial",
-            "NearEq": "near equatorial",
-            "MidLat": "mid latitude",
-            "NearPo": "near polar",
-            "Po": "polar",
-            "DD": "dawn-dusk local solar time",
-            "AM": "morning local solar time",
-            "Noon": "noon local solar time",
-            "PM": "afternoon local solar time",
-            "VL": "very low altitude",
-            "L": "low altitude",
-            "M": "medium altitude",
-            "H": "high altitude",
-            "VH": "very high altitude",
-            "NRC": "no repeat cycle",
-            "SRC": "short repeat cycle",
-            "LRC": "long repeat cycle"
-        }
-        if orbit is not None:
-            orbit_parts = orbit.split('-')
-            text_orbit = "a "
-            first = True
-            for orbit_part in orbit_parts:
-                if first:
-                    first = False
-                else:
-                    text_orbit += ', '
-                text_orbit += orbit_codes[orbit_part]
-            text_orbit += " orbit"
-        else:
-            text_orbit = "none"
-        return text_orbit
+def query(query, data, plan=None):
+    if plan is None:
+        plan = query_plans.QueryPlan(query)
 
-    def print_date(date):
-        return date.strftime('%d %B %Y')
+    # Only use a connection to the database the query is for
+    if plan.uses_edl:
+        session = edl_models.get_session()
+    else:
+        session = models.get_session()
 
     # Build the final query to the database
-    always_template = Template(query["always"])
-    expression = always_template.substitute(data)
-    for opt_cond in query["opt"]:
-        if opt_cond["cond"] in data:
-            opt_template = Template(opt_cond["query_part"])
-            expression += opt_template.substitute(data)
-    end_template = Template(query["end"])
-    expression += end_template.substitute(data)
-    query_db = eval(expression)
+    query_db = plan.build(session, data)
 
+    # The rows are fetched once, with the relationships the result fields use, whatever the number of results
+    rows = None
     results = []
-    for result_info in query["results"]:
+    for result_info, result_fields in zip(query["results"], plan.result_fields):
         if result_info["result_type"] == "list":
+            if rows is None:
+                rows = query_db.all()
             result = []
-            for row in query_db.all():
+            for row in rows:
+                scope = {"row": row, "data": data}
                 result_row = {}
-                for key, value in result_info["result_fields"].items():
-                    result_row[key] = eval(Template(value).substitute(data))
+                for key, accessor in result_fields.items():
+                    result_row[key] = accessor(scope, data)
                 result.append(result_row)
         elif result_info["result_type"] == "single":
-            row = query_db.first()
+            if rows is not None:
+                row = rows[0] if len(rows) > 0 else None
+            else:
+                row = query_db.first()
+            scope = {"row": row, "data": data}
             result = {}
-            for key, value in result_info["result_fields"].items():
-                result[key] = eval(Template(value).substitute(data))
+            for key, accessor in result_fields.items():
+                result[key] = accessor(scope, data)
         else:
             raise ValueError("RIP result_type")
         results.append(result)
@@ -262,27 +185,31 @@ def query(query, data):
     return results
 
 
-def run_function(function_info, data, context: UserInformation):
+def run_function(function_info, data, context: UserInformation, plan=None):
+    if plan is None:
+        plan = query_plans.FunctionPlan(function_info)
+
     # Run the function and save the results
-    run_template = Template(function_info["run_template"])
-    run_command = run_template.substitute(data)
-    command_results = eval(run_command)
+    command_results = plan.run(data, context)
     if len(function_info["results"]) == 1:
         command_results = (command_results,)
 
     results = []
-    for index, result_info in enumerate(function_info["results"]):
+    for index, (result_info, result_fields) in enumerate(zip(function_info["results"], plan.result_fields)):
+        scope = {"data": data, "context": context, "command_results": command_results, "index": index,
+                 "command_result": command_results[index]}
         if result_info["result_type"] == "list":
             result = []
             for item in command_results[index]:
+                scope["item"] = item
                 result_row = {}
-                for key, value in result_info["result_fields"].items():
-                    result_row[key] = eval(Template(value).substitute(data))
+                for key, accessor in result_fields.items():
+                    result_row[key] = accessor(scope, data)
                 result.append(result_row)
         elif result_info["result_type"] == "single":
             result = {}
-            for key, value in result_info["result_fields"].items():
-                result[key] = eval(Template(value).substitute(data))
+            for key, accessor in result_fields.items():
+                result[key] = accessor(scope, data)
         else:
             raise ValueError("RIP result_type")
         results.append(result)
@@ -290,17 +217,20 @@ def run_function(function_info, data, context: UserInformation):
     return results
 
 
-def build_answers(voice_response_templates, visual_response_templates, results, data):
+def build_answers(voice_response_templates, visual_response_templates, results, data, templates=None):
+    if templates is None:
+        templates = command_type_registry.TemplateCache()
+
     complete_data = data
     complete_data["results"] = results
 
     answers = {}
 
-    def build_text_from_list(templates, result):
+    def build_text_from_list(list_templates, result):
         text = ""
-        begin_template = Template(templates["begin"])
+        begin_template = templates[list_templates["begin"]]
         text += begin_template.substitute(complete_data)
-        repeat_template = Template(templates["repeat"])
+        repeat_template = templates[list_templates["repeat"]]
         if len(result) > 0:
             first = True
             for item in result:
@@ -311,12 +241,12 @@ def build_answers(voice_response_templates, visual_response_templates, results,
                 text += repeat_template.substitute(item)
         else:
             text += "none"
-        end_template = Template(templates["end"])
+        end_template = templates[list_templates["end"]]
         text += end_template.substitute(complete_data)
         return text
 
     def build_text_from_single(template, result):
-        text_template = Template(template["template"])
+        text_template = templates[template["template"]]
         result_data = complete_data
         for key, value in result.items():
             result_data[key] = value
@@ -344,24 +274,24 @@ def build_answers(voice_response_templates, visual_response_templates, results,
         elif visual_response_templates[index]["type"] == "list":
             answers["visual_answer_type"].append("list")
             visual_answer = {}
-            begin_template = Template(visual_response_templates[index]["begin"])
+            begin_template = templates[visual_response_templates[index]["begin"]]
             visual_answer["begin"] = begin_template.substitute(complete_data)
             visual_answer["list"] = []
-            item_template = Template(visual_response_templates[index]["item_template"])
+            item_template = templates[visual_response_templates[index]["item_template"]]
             for item in result:
                 visual_answer["list"].append(item_template.substitute(item))
             answers["visual_answer"].append(visual_answer)
         elif visual_response_templates[index]["type"] == "timeline_plot":
             answers["visual_answer_type"].append("timeline_plot")
             visual_answer = {}
-            title_template = Template(visual_response_templates[index]["title"])
+            title_template = templates[visual_response_templates[index]["title"]]
             visual_answer["title"] = title_template.substitute(complete_data)
             visual_answer["plot_data"] = []
+            category_template = templates[visual_response_templates[index]["item"]["category"]]
+            id_template = templates[visual_response_templates[index]["item"]["id"]]
+            start_template = templates[visual_response_templates[index]["item"]["start"]]
+            end_template = templates[visual_response_templates[index]["item"]["end"]]
             for item in result:
-                category_template = Template(visual_response_templates[index]["item"]["category"])
-                id_template = Template(visual_response_templates[index]["item"]["id"])
-                start_template = Template(visual_response_templates[index]["item"]["start"])
-                end_template = Template(visual_response_templates[index]["item"]["end"])
                 visual_answer["plot_data"].append({
                     "category": category_template.substitute(item),
                     "id": id_template.substitute(item),
@@ -372,24 +302,24 @@ def build_answers(voice_response_templates, visual_response_templates, results,
         elif visual_response_templates[index]["type"] == "hist_plot":
             answers["visual_answer_type"].append("hist_plot")
             visual_answer = {}
-            title_template = Template(visual_response_templates[index]["title"])
+            title_template = templates[visual_response_templates[index]["title"]]
             visual_answer["plot_info"] = {"plot_data": []}
             visual_answer["plot_info"]["title"] = title_template.substitute(complete_data)
+            item_template = templates[visual_response_templates[index]["item_template"]]
             for item in result:
-                item_template = Template(visual_response_templates[index]["item_template"])
                 visual_answer["plot_info"]["plot_data"].append(float(item_template.substitute(item)))
             answers["visual_answer"].append(visual_answer)
         elif visual_response_templates[index]["type"] == "plot_vars":
             answers["visual_answer_type"].append("plot_vars")
             visual_answer = {}
             visual_answer["plot_info"] = {"plot_data": []}
+            item_template = templates[visual_response_templates[index]["item_template"]]
             for item in result:
-                item_template = Template(visual_response_templates[index]["item_template"])
                 visual_answer["plot_info"]["plot_data"].append(eval(item_template.substitute(item)))
-            title_template = Template(visual_response_templates[index]["title"])
+            title_template = templates[visual_response_templates[index]["title"]]
             visual_answer["plot_info"]["title"] = title_template.substitute(complete_data)
-            x_axis_template = Template(visual_response_templates[index]["x_axis_template"])
-            y_axis_template = Template(visual_response_templates[index]["y_axis_template"])
+            x_axis_template = templates[visual_response_templates[index]["x_axis_template"]]
+            y_axis_template = templates[visual_response_templates[index]["y_axis_template"]]
             visual_answer["plot_info"]["x_axis"] = x_axis_template.substitute(complete_data)
             visual_answer["plot_info"]["y_axis"] = y_axis_template.substitute(complete_data)
             answers["visual_answer"].append(visual_answer)
@@ -0,0 +1,434 @@
+import ast
+import operator
+import re
+import threading
+from collections import OrderedDict
+from string import Template
+
+from django.conf import settings
+from sqlalchemy import bindparam, func, or_
+from sqlalchemy.ext import baked
+from sqlalchemy.orm import joinedload, selectinload
+
+import daphne_API.historian.models as models
+import daphne_API.runnable_functions as run_func
+
+if 'EDL' in settings.ACTIVE_MODULES:
+    import daphne_API.edl.model as edl_models
+
+# Cache of the compiled SQL of every query plan and combination of optional conditions
+bakery = baked.bakery(size=500)
+
+# Number of sources kept compiled by each plan or result field. Those with the extracted values substituted in
+# change with every question, so only the most recently used are kept
+CODE_CACHE_SIZE = 64
+
+# data['key'] accesses are matched before string literals so their key is not taken as a literal
+EXPRESSION_TOKEN = re.compile(r"""(?P<data_item>\bdata\[(['"])(?P<key>\w+)\2\])|"""
+                              r"""(?P<literal>'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*")""")
+ATTRIBUTE_ACCESS = re.compile(r"^(\w+)\.(\w+)$")
+ITEM_ACCESS = re.compile(r"""^(\w+)\[(['"])(\w+)\2\]$""")
+NAME_ACCESS = re.compile(r"^(\w+)$")
+
+
+def print_orbit(orbit):
+    text_orbit = ""
+    orbit_codes = {
+        "GEO": "geostationary",
+        "LEO": "low earth",
+        "HEO": "highly elliptical",
+        "SSO": "sun-synchronous",
+        "Eq": "equatorial",
+        "NearEq": "near equatorial",
+        "MidLat": "mid latitude",
+        "NearPo": "near polar",
+        "Po": "polar",
+        "DD": "dawn-dusk local solar time",
+        "AM": "morning local solar time",
+        "Noon": "noon local solar time",
+        "PM": "afternoon local solar time",
+        "VL": "very low altitude",
+        "L": "low altitude",
+        "M": "medium altitude",
+        "H": "high altitude",
+        "VH": "very high altitude",
+        "NRC": "no repeat cycle",
+        "SRC": "short repeat cycle",
+        "LRC": "long repeat cycle"
+    }
+    if orbit is not None:
+        orbit_parts = orbit.split('-')
+        text_orbit = "a "
+        first = True
+        for orbit_part in orbit_parts:
+            if first:
+                first = False
+            else:
+                text_orbit += ', '
+            text_orbit += orbit_codes[orbit_part]
+        text_orbit += " orbit"
+    else:
+        text_orbit = "none"
+    return text_orbit
+
+
+def print_date(date):
+    return date.strftime('%d %B %Y')
+
+
+# Names available to the query, function and result field expressions of the command types
+plan_globals = {
+    "models": models,
+    "run_func": run_func,
+    "or_": or_,
+    "func": func,
+    "bindparam": bindparam,
+    "print_orbit": print_orbit,
+    "print_date": print_date
+}
+if 'EDL' in settings.ACTIVE_MODULES:
+    plan_globals["edl_models"] = edl_models
+
+
+class NotCompilableError(Exception):
+    def __init__(self, expression):
+        self.expression = expression
+
+
+def has_placeholders(text):
+    return any(match.group('named') or match.group('braced') for match in Template.pattern.finditer(text))
+
+
+def rewrite_expression(expression, params, literal_replacement, data_replacement=None):
+    """
+    Rewrite a command type expression so its values are not pasted into the source anymore. String literals with
+    template placeholders are replaced by literal_replacement(param_name), and their template is added to params. If
+    data_replacement is given, data['key'] accesses are replaced by data_replacement(key).
+    Raises NotCompilableError if a placeholder is found outside of a string literal, as it changes the code itself.
+    """
+    rewritten = ""
+    position = 0
+    for token in EXPRESSION_TOKEN.finditer(expression):
+        rewritten += check_code(expression[position:token.start()], expression)
+        if token.group('data_item') is not None:
+            if data_replacement is not None:
+                rewritten += data_replacement(token.group('key'))
+            else:
+                rewritten += token.group()
+        elif has_placeholders(token.group()):
+            param_name = "_p" + str(len(params))
+            params[param_name] = Template(ast.literal_eval(token.group()))
+            rewritten += literal_replacement(param_name)
+        else:
+            rewritten += token.group()
+        position = token.end()
+    rewritten += check_code(expression[position:], expression)
+    return rewritten
+
+
+def check_code(code, expression):
+    if '$' in code:
+        raise NotCompilableError(expression)
+    return code
+
+
+def compile_evaluator(source):
+    """ Turn an expression into a function of a scope dictionary, skipping eval for the usual simple accesses """
+    match = ATTRIBUTE_ACCESS.match(source)
+    if match and match.group(1) not in plan_globals:
+        name, attribute = match.group(1), operator.attrgetter(match.group(2))
+        return lambda scope: attribute(scope[name])
+    match = ITEM_ACCESS.match(source)
+    if match and match.group(1) not in plan_globals:
+        name, key = match.group(1), match.group(3)
+        return lambda scope: scope[name][key]
+    match = NAME_ACCESS.match(source)
+    if match and match.group(1) not in plan_globals:
+        name = match.group(1)
+        return lambda scope: scope[name]
+    code = compile(source, "<result field>", "eval")
+    return lambda scope: eval(code, plan_globals, scope)
+
+
+class CodeCache:
+    """ LRU cache of what compile_function makes of each source """
+
+    def __init__(self, compile_function, size=CODE_CACHE_SIZE):
+        self.compile_function = compile_function
+        self.size = size
+        self._compiled = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source):
+        with self._lock:
+            compiled = self._compiled.get(source)
+            if compiled is not None:
+                self._compiled.move_to_end(source)
+                return compiled
+        compiled = self.compile_function(source)
+        with self._lock:
+            self._compiled[source] = compiled
+            while len(self._compiled) > self.size:
+                self._compiled.popitem(last=False)
+        return compiled
+
+
+def compile_query(source):
+    return compile(source, "<query>", "eval")
+
+
+def compile_function_call(source):
+    return compile(source, "<run_function>", "eval")
+
+
+class FieldAccessor:
+    """ A compiled result_fields expression """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.params = {}
+        try:
+            self.source = rewrite_expression(expression, self.params, lambda param_name: param_name)
+            self.evaluator = compile_evaluator(self.source)
+            self.template = None
+        except NotCompilableError:
+            # The value of the parameters becomes part of the code (e.g. row.${parameter}), so it is compiled once
+            # for every different value
+            self.source = None
+            self.template = Template(expression)
+            self.evaluators = CodeCache(compile_evaluator)
+
+    def __call__(self, scope, data):
+        if self.template is None:
+            for param_name, template in self.params.items():
+                scope[param_name] = template.substitute(data)
+            return self.evaluator(scope)
+        return self.evaluators.get(self.template.substitute(data))(scope)
+
+
+def compile_result_fields(results_info):
+    return [{key: FieldAccessor(value) for key, value in result_info["result_fields"].items()}
+            for result_info in results_info]
+
+
+def query_entity(source):
+    """ The mapped class a query selects if it selects a single one, e.g. models.Mission in session.query(models.Mission) """
+    try:
+        tree = ast.parse(source, mode='eval')
+    except SyntaxError:
+        return None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'query' \
+                and isinstance(node.func.value, ast.Name) and node.func.value.id in ('session', 'edl_session'):
+            if len(node.args) != 1 or len(node.keywords) != 0:
+                return None
+            try:
+                entity = eval(compile(ast.Expression(node.args[0]), "<query entity>", "eval"), plan_globals)
+            except Exception:
+                return None
+            return entity if hasattr(entity, '__mapper__') else None
+    return None
+
+
+def relationship_paths(source, entity):
+    """
+    The relationships of entity a result field expression goes through, starting from row. Variables of comprehensions
+    are followed, e.g. [agency.name for instrument in row.instruments for agency in instrument.agencies] gives
+    (Mission.instruments,) and (Mission.instruments, Instrument.agencies).
+    """
+    bound = {"row": (entity, ())}
+    paths = set()
+
+    def resolve(node):
+        if isinstance(node, ast.Name):
+            return bound.get(node.id)
+        if isinstance(node, ast.Attribute):
+            base = resolve(node.value)
+            if base is None:
+                return None
+            base_entity, path = base
+            relationship = base_entity.__mapper__.relationships.get(node.attr)
+            if relationship is None:
+                return None
+            paths.add(path + (relationship,))
+            return relationship.mapper.class_, path + (relationship,)
+        return None
+
+    tree = ast.parse(source, mode='eval')
+    for node in ast.walk(tree):
+        if isinstance(node, ast.comprehension) and isinstance(node.target, ast.Name):
+            resolved = resolve(node.iter)
+            if resolved is not None:
+                bound[node.target.id] = resolved
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            resolve(node)
+    return paths
+
+
+def declared_relationship_paths(names, entity):
+    """ The paths of the dotted relationship names listed in the "eager_load" section of a query """
+    paths = set()
+    for name in names:
+        current_entity = entity
+        path = ()
+        for attribute in name.split('.'):
+            relationship = current_entity.__mapper__.relationships.get(attribute)
+            if relationship is None:
+                raise ValueError(attribute + " in eager_load is not a relationship of " + current_entity.__name__)
+            path = path + (relationship,)
+            current_entity = relationship.mapper.class_
+        paths.add(path)
+    return paths
+
+
+loaders = {"selectinload": selectinload, "joinedload": joinedload}
+
+
+def eager_load_options(paths):
+    """
+    Loader options fetching every relationship in paths with the query: collections with selectinload, which adds
+    one SELECT per relationship whatever the number of rows, and many-to-one relationships with joinedload
+    """
+    options = []
+    for path in sorted(paths, key=lambda path: [relationship.key for relationship in path]):
+        # Paths contained in a longer one are already loaded by its option
+        if any(len(other) > len(path) and other[:len(path)] == path for other in paths):
+            continue
+        option = None
+        for relationship in path:
+            loader_name = "selectinload" if relationship.uselist else "joinedload"
+            if option is None:
+                option = loaders[loader_name](relationship.class_attribute)
+            else:
+                option = getattr(option, loader_name)(relationship.class_attribute)
+        options.append(option)
+    return options
+
+
+class QueryPart:
+    def __init__(self, expression, all_params):
+        self.data_keys = []
+
+        def data_replacement(key):
+            self.data_keys.append(key)
+            return "bindparam('" + key + "')"
+
+        # Parameter names are numbered across all the parts of a query so they stay unique
+        previous_params = set(all_params)
+        try:
+            self.source = rewrite_expression(expression, all_params,
+                                             lambda param_name: "bindparam('" + param_name + "')", data_replacement)
+            self.compilable = True
+        except NotCompilableError:
+            self.source = expression
+            self.compilable = False
+        self.params = {param_name: template for param_name, template in all_params.items()
+                       if param_name not in previous_params}
+
+
+class QueryPlan:
+    """
+    A db_query command type compiled into a parameterised SQLAlchemy query. All the values extracted from the question
+    are sent as bound parameters, so the SQL of each combination of optional conditions is compiled once (through
+    the baked query cache) and reused by every request.
+    """
+
+    def __init__(self, query_spec):
+        self.spec = query_spec
+        all_params = {}
+        self.always = QueryPart(query_spec["always"], all_params)
+        self.optional = [(opt_cond["cond"], QueryPart(opt_cond["query_part"], all_params))
+                         for opt_cond in query_spec["opt"]]
+        self.end = QueryPart(query_spec["end"], all_params)
+        self.compilable = self.always.compilable and self.end.compilable and \
+            all(part.compilable for cond, part in self.optional)
+        self.uses_edl = 'edl_session' in query_spec["always"]
+        self.result_fields = compile_result_fields(query_spec["results"])
+        eager_load_paths = self.eager_load_paths(query_spec.get("eager_load", []))
+        self.eager_load = eager_load_options(eager_load_paths)
+        # Part of the baked query cache key, as two command types can share a query but not their eager loads
+        self.eager_load_key = tuple(sorted(".".join(str(relationship) for relationship in path)
+                                           for path in eager_load_paths))
+        self._codes = CodeCache(compile_query)
+
+    def eager_load_paths(self, declared):
+        """ Relationships used by the result fields (or declared in the query) are loaded along with the rows """
+        entity = query_entity(self.always.source)
+        if entity is None:
+            return set()
+        paths = declared_relationship_paths(declared, entity)
+        for result_fields in self.result_fields:
+            for accessor in result_fields.values():
+                if accessor.source is not None:
+                    paths.update(relationship_paths(accessor.source, entity))
+        return paths
+
+    def selected_parts(self, data):
+        return [self.always] + [part for cond, part in self.optional if cond in data] + [self.end]
+
+    def build(self, session, data):
+        """ Returns the query (or baked query result) ready to fetch its rows """
+        parts = self.selected_parts(data)
+        if not self.compilable:
+            return self.build_uncompiled(session, data, parts)
+
+        source = "".join(part.source for part in parts)
+        code = self._codes.get(source)
+
+        params = {}
+        for part in parts:
+            for param_name, template in part.params.items():
+                params[param_name] = template.substitute(data)
+            for key in part.data_keys:
+                params[key] = data[key]
+
+        baked_query = bakery(lambda query_session: self.with_eager_load(
+            eval(code, plan_globals, {"session": query_session, "edl_session": query_session})),
+                             source, self.eager_load_key)
+        return baked_query(session).params(**params)
+
+    def with_eager_load(self, query):
+        if len(self.eager_load) > 0:
+            return query.options(*self.eager_load)
+        return query
+
+    def build_uncompiled(self, session, data, parts):
+        source = "".join(Template(part.source).substitute(data) for part in parts)
+        code = self._codes.get(source)
+        return self.with_eager_load(eval(code, plan_globals, {"session": session, "edl_session": session,
+                                                              "data": data}))
+
+
+class FunctionPlan:
+    """ A run_function command type with its call compiled once, receiving the extracted values as variables """
+
+    def __init__(self, function_spec):
+        self.spec = function_spec
+        self.params = {}
+        try:
+            self.source = rewrite_expression(function_spec["run_template"], self.params,
+                                             lambda param_name: param_name)
+            self.code = compile(self.source, "<run_function>", "eval")
+        except NotCompilableError:
+            self.source = function_spec["run_template"]
+            self.code = None
+        self._codes = CodeCache(compile_function_call)
+        self.result_fields = compile_result_fields(function_spec.get("results", []))
+
+    def run(self, data, context):
+        scope = {"data": data, "context": context}
+        if self.code is not None:
+            for param_name, template in self.params.items():
+                scope[param_name] = template.substitute(data)
+            return eval(self.code, plan_globals, scope)
+
+        return eval(self._codes.get(Template(self.source).substitute(data)), plan_globals, scope)
+
+
+def compile_plan(type_info):
+    if type_info["type"] == "db_query":
+        return QueryPlan(type_info["query"])
+    elif type_info["type"] == "run_function":
+        return FunctionPlan(type_info["function"])
+    return None
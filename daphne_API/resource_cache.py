@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+
+import pandas
+
+logger = logging.getLogger('debugging')
+
+SNAPSHOTS_PATH = "./daphne_API/xls_snapshots/"
+
+
+class ResourceCache:
+    """
+    Spreadsheets used by the problem-specific skills, read with pandas once and then kept in memory. Each sheet is
+    also saved as a pickled snapshot next to the code, so the next worker does not need to parse the workbook again.
+    Snapshots and memoised sheets are keyed by the modification time of the workbook, so editing it invalidates both.
+    """
+
+    def __init__(self, snapshots_path=SNAPSHOTS_PATH):
+        self.snapshots_path = snapshots_path
+        self._frames = {}
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def snapshot_file(self, path, sheet_name, header):
+        key = "|".join([os.path.abspath(path), str(sheet_name), str(header)])
+        return os.path.join(self.snapshots_path, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".pkl")
+
+    def read_excel(self, path, sheet_name=0, header=0):
+        """ Same DataFrame as pandas.read_excel(path, sheet_name=sheet_name, header=header). Do not modify it """
+        mtime = os.stat(path).st_mtime
+        key = (path, sheet_name, header)
+        cached = self._frames.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        frame = self.load_snapshot(path, sheet_name, header, mtime)
+        if frame is None:
+            frame = pandas.read_excel(path, sheet_name=sheet_name, header=header)
+            self.save_snapshot(path, sheet_name, header, mtime, frame)
+        with self._lock:
+            self._frames[key] = (mtime, frame)
+        return frame
+
+    def load_snapshot(self, path, sheet_name, header, mtime):
+        try:
+            with open(self.snapshot_file(path, sheet_name, header), 'rb') as file:
+                snapshot = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        if snapshot["mtime"] != mtime:
+            return None
+        return snapshot["frame"]
+
+    def save_snapshot(self, path, sheet_name, header, mtime, frame):
+        snapshot_file = self.snapshot_file(path, sheet_name, header)
+        temporary_file = None
+        try:
+            os.makedirs(self.snapshots_path, exist_ok=True)
+            # Written to a file of its own first, so no other worker or thread ever reads (or writes) half a snapshot
+            with tempfile.NamedTemporaryFile(dir=self.snapshots_path, suffix=".tmp", delete=False) as file:
+                temporary_file = file.name
+                pickle.dump({"mtime": mtime, "frame": frame}, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_file, snapshot_file)
+        except OSError:
+            if temporary_file is not None and os.path.exists(temporary_file):
+                os.remove(temporary_file)
+            logger.warning("Could not save the snapshot of " + path + " (" + str(sheet_name) + ")")
+
+    def derive(self, path, name, compute):
+        """ Memoise a value computed from the sheets of a workbook, until the workbook changes """
+        mtime = os.stat(path).st_mtime
+        key = (path, name)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        value = compute()
+        with self._lock:
+            self._derived[key] = (mtime, value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._frames.clear()
+            self._derived.clear()
+
+
+cache = ResourceCache()
+
+
+def read_excel(path, sheet_name=0, header=0):
+    return cache.read_excel(path, sheet_name=sheet_name, header=header)
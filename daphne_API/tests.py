@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from django.test import TestCase
+
+from daphne_API import classifier_registry, command_processing, data_helpers, dataset_cache, design_encoding
+from daphne_API.management.commands.export_classifiers import template_questions
+from daphne_API.models import Design
+from daphne_API.numpy_classifier import ARTIFACT_NAME, NumpyClassifier, export_classifier
+from daphne_brain.nlp_object import nlp
+
+try:
+    import tensorflow
+except ImportError:
+    tensorflow = None
+
+
+class NumpyClassifierTestCase(TestCase):
+    """ The NumPy engine gives the same logits as the TensorFlow graph it was exported from """
+
+    def setUp(self):
+        if tensorflow is None:
+            raise unittest.SkipTest('TensorFlow is not installed')
+        self.modules = [module_name for module_name in ["general"] + command_processing.command_options
+                        if os.path.exists(os.path.join(classifier_registry.MODELS_PATH, module_name, "checkpoint"))]
+        if len(self.modules) == 0:
+            raise unittest.SkipTest('There are no classifier checkpoints')
+        questions = [question.strip().lower() for question in template_questions()]
+        self.cleaned_questions = [data_helpers.clean_str(doc) for doc in nlp.pipe(questions)]
+
+    def test_same_logits(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for module_name in self.modules:
+                with self.subTest(module=module_name):
+                    classifier = classifier_registry.registry.load_tensorflow(module_name)
+                    artifact_path = os.path.join(directory, module_name + "_" + ARTIFACT_NAME)
+                    export_classifier(classifier, artifact_path)
+                    expected = classifier.logits(self.cleaned_questions)
+                    obtained = NumpyClassifier(module_name, artifact_path).logits(self.cleaned_questions)
+                    np.testing.assert_allclose(obtained, expected, atol=1e-4)
+                    np.testing.assert_array_equal(obtained.argmax(axis=1), expected.argmax(axis=1))
+
+
+class DesignEncodingTestCase(TestCase):
+    """ Packed inputs and outputs unpack to the same values, one by one or a column at a time """
+
+    def assertRoundTrip(self, values, code, dtype):
+        packed = design_encoding.pack(values)
+        self.assertEqual(packed[0], code)
+        array = design_encoding.unpack(packed)
+        self.assertEqual(array.dtype, dtype)
+        self.assertEqual(array.tolist(), list(values))
+        self.assertFalse(array.flags.writeable)
+        rows = design_encoding.unpack_rows([packed, bytearray(packed), memoryview(packed)])
+        self.assertEqual(rows.shape, (3, len(values)))
+        self.assertEqual(rows.tolist(), [list(values)] * 3)
+
+    def test_bool(self):
+        # Lengths that are and are not a multiple of 8, as the last byte of the bits is padded
+        for length in [1, 8, 13, 60]:
+            self.assertRoundTrip([index % 3 == 0 for index in range(length)], design_encoding.BITS, np.bool_)
+
+    def test_int(self):
+        self.assertRoundTrip([0, 1, -128, 127], design_encoding.INT8, np.int8)
+        self.assertRoundTrip([0, 300, -32768, 32767], design_encoding.INT16, np.int16)
+        self.assertRoundTrip([0, 70000, -2 ** 31, 2 ** 31 - 1], design_encoding.INT32, np.int32)
+
+    def test_float64(self):
+        self.assertRoundTrip([0.1, -2.5, 1e300, 4000.], design_encoding.FLOAT64, np.float64)
+        self.assertRoundTrip([1, 2 ** 40], design_encoding.FLOAT64, np.float64)
+        packed = design_encoding.pack_outputs([1, 2])
+        self.assertEqual(design_encoding.unpack(packed).dtype, np.float64)
+        self.assertEqual(design_encoding.unpack(packed).tolist(), [1., 2.])
+
+    def test_empty(self):
+        self.assertEqual(design_encoding.unpack(design_encoding.pack([])).tolist(), [])
+        self.assertEqual(design_encoding.unpack(design_encoding.pack_outputs([])).tolist(), [])
+        self.assertEqual(design_encoding.unpack(b'').tolist(), [])
+        self.assertEqual(design_encoding.unpack_rows([]).shape, (0, 0))
+
+    def test_json(self):
+        values = [[1, 2], [3]]
+        self.assertEqual(design_encoding.pack(values)[0], design_encoding.JSON)
+        self.assertEqual(design_encoding.unpack(design_encoding.pack(values)).tolist(), values)
+
+    def test_mixed_rows(self):
+        rows = design_encoding.unpack_rows([design_encoding.pack([1, 2]), design_encoding.pack([1, 300])])
+        self.assertEqual(rows.tolist(), [[1, 2], [1, 300]])
+
+    def test_digest(self):
+        inputs = [True, False, True, True]
+        digest = design_encoding.digest(design_encoding.pack(inputs))
+        self.assertEqual(len(digest), 32)
+        self.assertEqual(digest, design_encoding.digest(design_encoding.pack(np.array(inputs))))
+        self.assertEqual(digest, design_encoding.digest(bytearray(design_encoding.pack(inputs))))
+        self.assertNotEqual(digest, design_encoding.digest(design_encoding.pack([True, False, True, False])))
+        # Digests are stored in the database, so the same inputs must always give the same one
+        self.assertEqual(digest, '14169eb9acd7b59d39161e1ab1d3e450')
+        self.assertEqual(design_encoding.digest(design_encoding.pack([1, 2, 3])), '2975243da73bf118ae94d62ca389e135')
+
+
+class DesignDatasetTestCase(TestCase):
+    """ The datasets of designs with different lengths are kept as lists instead of failing to load """
+
+    def test_mixed_lengths(self):
+        designs = [Design(id=0, inputs=[True, False, True], outputs=[0.1, 2000.]),
+                   Design(id=1, inputs=[[1, 2], [3]], outputs=[0.3]),
+                   Design(id=2, inputs=[1, 2], outputs=[0.2, 1000., 5.])]
+        dataset = dataset_cache.DesignDataset.from_designs(0, designs)
+        self.assertEqual(dataset.designs(), [(0, [True, False, True], [0.1, 2000.]), (1, [[1, 2], [3]], [0.3]),
+                                             (2, [1, 2], [0.2, 1000., 5.])])
+        self.assertEqual(dataset.row(2), 2)
+        self.assertEqual(dataset.input_width(), 3)
+        self.assertEqual(dataset.output_width(), 3)
+        np.testing.assert_array_equal(dataset.first_outputs(2), [[0.1, 2000.], [0.3, np.nan], [0.2, 1000.]])
+
+    def test_same_lengths(self):
+        designs = [Design(id=index, inputs=[index % 2 == 0] * 4, outputs=[index, 2 * index]) for index in range(3)]
+        dataset = dataset_cache.DesignDataset.from_designs(0, designs)
+        self.assertEqual(dataset.inputs.shape, (3, 4))
+        self.assertEqual(dataset.output_width(), 2)
+        np.testing.assert_array_equal(dataset.first_outputs(2), [[0., 0.], [1., 2.], [2., 4.]])
@@ -4,7 +4,9 @@ from . import views
 
 urlpatterns = [
     path('command', views.Command.as_view(), name='command'),
+    path('classify-commands', views.ClassifyCommands.as_view(), name='classify_commands'),
     path('commands', views.CommandList.as_view(), name='command_list'),
+    path('latency-stats', views.LatencyStats.as_view(), name='latency_stats'),
     path('import-data', views.ImportData.as_view(), name='daphne_import_data'),
     path('save-data', views.SaveData.as_view(), name='daphne_save_data'),
     path('download-data', views.DownloadData.as_view(), name='daphne_download_data'),
@@ -8,10 +8,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from daphne_API.background_search import send_archs_from_queue_to_main_dataset, send_archs_back
+from daphne_brain import startup
 from daphne_brain.nlp_object import nlp
 import daphne_API.command_processing as command_processing
+from daphne_API import dataset_cache, latency
 from auth_API.helpers import get_or_create_user_information
-from daphne_API.models import Design, Answer, AllowedCommand
+from daphne_API.models import Design
 import daphne_API.command_lists as command_lists
 from VASSAR_API.api import VASSARClient
 
@@ -27,42 +29,56 @@ class Command(APIView):
 
     def post(self, request, format=None):
         # Preprocess the command
-        processed_command = nlp(request.data['command'].strip().lower())
+        with latency.span("nlp"):
+            processed_command = nlp(request.data['command'].strip().lower())
 
         # Classify the command, obtaining a command type
-        command_options = ['iFEED', 'VASSAR', 'Critic', 'Historian', 'EDL']
-        condition_names = ['ifeed', 'analyst', 'critic', 'historian', 'edl']
-        command_types = command_processing.classify_command(processed_command)
+        with latency.span("classify", "general"):
+            command_types = command_processing.classify_command(processed_command)
 
         # Define context and see if it was already defined for this session
         user_info = get_or_create_user_information(request.session, request.user, 'EOSS')
 
-        # Remove all past answers related to this user
-        Answer.objects.filter(eosscontext__exact=user_info.eosscontext).delete()
-        AllowedCommand.objects.filter(eosscontext__exact=user_info.eosscontext).delete()
+        # Only write the allowed commands if they changed since the last command
+        allowed_commands = command_processing.update_allowed_commands(user_info.eosscontext,
+                                                                      request.data.get('allowed_commands', {}))
 
-        if 'allowed_commands' in request.data:
-            for command_type, command_list in request.data['allowed_commands'].items():
-                for command_number in command_list:
-                    AllowedCommand.objects.create(eosscontext=user_info.eosscontext, command_type=command_type,
-                                                  command_descriptor=command_number)
+        # Act based on the types, with all the skills running concurrently
+        answers = command_processing.run_commands(processed_command, command_types, user_info, allowed_commands)
+        command_processing.save_answers(user_info.eosscontext, answers)
 
-        # Act based on the types
-        for command_type in command_types:
-            command_class = command_options[command_type]
-            condition_name = condition_names[command_type]
+        frontend_response = command_processing.think_response(user_info, answers)
 
-            answer = command_processing.command(processed_command, command_class,
-                                                condition_name, user_info)
-            Answer.objects.create(eosscontext=user_info.eosscontext,
-                                  voice_answer=answer["voice_answer"],
-                                  visual_answer_type=json.dumps(answer["visual_answer_type"]),
-                                  visual_answer=json.dumps(answer["visual_answer"]))
+        return Response({'response': frontend_response})
 
-        frontend_response = command_processing.think_response(user_info)
 
-        return Response({'response': frontend_response})
+class ClassifyCommands(APIView):
+    """
+    Classify a batch of commands without answering them, for replaying transcripts and regression suites
+    """
+
+    def post(self, request, format=None):
+        commands = request.data['commands']
+        if isinstance(commands, str):
+            commands = json.loads(commands)
+        top_number = int(request.data.get('top_number', 1))
+
+        processed_commands = list(nlp.pipe([command.strip().lower() for command in commands]))
+        classifications = command_processing.classify_batch(processed_commands, top_number)
 
+        return Response({'classifications': classifications})
+
+
+class LatencyStats(APIView):
+    """
+    Time taken by each stage of answering the questions since the worker started, and the slowest questions
+    """
+
+    def get(self, request, format=None):
+        return Response({
+            'latency': latency.stats.report(),
+            'startup': startup.report()
+        })
 
 
 class CommandList(APIView):
@@ -151,7 +167,7 @@ class ImportData(APIView):
                 architectures = []
                 architectures_json = []
 
-                inputs_unique_set = set()
+                input_digests = set()
                 # For each row, store the information
                 has_header = csv.Sniffer().has_header(csvfile.read(1024))
                 csvfile.seek(0)
@@ -188,22 +204,24 @@ class ImportData(APIView):
                             out = float(out)
                         outputs.append(out)
 
-                    hashed_input = hash(tuple(inputs))
-                    if hashed_input not in inputs_unique_set:
-                        architectures.append(Design(id=user_info.eosscontext.last_arch_id,
-                                                    eosscontext=user_info.eosscontext,
-                                                    inputs=json.dumps(inputs),
-                                                    outputs=json.dumps(outputs)))
+                    design = Design(id=user_info.eosscontext.last_arch_id,
+                                    eosscontext=user_info.eosscontext,
+                                    inputs=inputs,
+                                    outputs=outputs)
+                    if design.input_digest not in input_digests:
+                        architectures.append(design)
                         architectures_json.append({'id': user_info.eosscontext.last_arch_id, 'inputs': inputs, 'outputs': outputs})
                         user_info.eosscontext.last_arch_id += 1
-                        inputs_unique_set.add(hashed_input)
+                        input_digests.add(design.input_digest)
 
             # Define context and see if it was already defined for this session
             Design.objects.bulk_create(architectures)
+            dataset_cache.cache.replace(user_info.eosscontext, architectures)
             user_info.eosscontext.problem = problem
             user_info.eosscontext.dataset_name = filename
             user_info.eosscontext.dataset_user = request.data['load_user_files'] == 'true'
-            user_info.eosscontext.save()
+            # Only the fields set here, replace() already updated dataset_version in the database
+            user_info.eosscontext.save(update_fields=['problem', 'dataset_name', 'dataset_user', 'last_arch_id'])
             user_info.save()
 
             return Response(architectures_json)
@@ -246,27 +264,25 @@ class SaveData(APIView):
                 with open(file_path, 'w', newline='') as csvfile:
                     writer = csv.writer(csvfile)
                     # Write header
+                    dataset = dataset_cache.cache.get(user_info.eosscontext)
                     if problem_type == 'binary':
-                        design = user_info.eosscontext.design_set.first()
-                        num_outputs = len(json.loads(design.outputs))
+                        num_outputs = dataset.output_width()
                         writer.writerow(['Inputs'] + ['Output' + str(i) for i in range(num_outputs)])
                     elif problem_type == 'discrete':
-                        design = user_info.eosscontext.design_set.first()
-                        num_inputs = len(json.loads(design.inputs))
-                        num_outputs = len(json.loads(design.outputs))
+                        num_inputs = dataset.input_width()
+                        num_outputs = dataset.output_width()
                         writer.writerow(['Input' + str(i) for i in range(num_inputs)] + ['Output' + str(i) for i in range(num_outputs)])
                     else:
                         raise ValueError("Not implemented!")
                     # Write designs
-                    for design in user_info.eosscontext.design_set.all():
-                        inputs = json.loads(design.inputs)
+                    for design_id, inputs, outputs in dataset.designs():
                         if problem_type == 'binary':
                             input_list = [''.join(['1' if x else '0' for x in inputs])]
                         elif problem_type == 'discrete':
                             input_list = inputs
                         else:
                             raise ValueError("Not implemented!")
-                        output_list = json.loads(design.outputs)
+                        output_list = outputs
                         writer.writerow(input_list + output_list)
 
                 return Response(filename + " has been saved correctly!")
@@ -395,7 +411,7 @@ class SetProblem(APIView):
         user_info = get_or_create_user_information(request.session, request.user, 'EOSS')
         problem = request.data['problem']
         user_info.eosscontext.problem = problem
-        user_info.eosscontext.save()
+        user_info.eosscontext.save(update_fields=['problem'])
         user_info.save()
         return Response({})
 
@@ -1,3 +1,39 @@
-import spacy
+import threading
 
-nlp = spacy.load('en_core_web_sm')
\ No newline at end of file
+from daphne_brain import startup
+
+SPACY_MODEL = 'en_core_web_sm'
+
+# The question pipeline only uses the tokens, their lemmas and lexical flags, so the dependency parser and the
+# named entity recognizer are not loaded. The tagger stays, as the lemmatizer needs the part of speech tags.
+DISABLED_COMPONENTS = ['parser', 'ner']
+
+
+class LazyLanguage:
+    """ Stands for the spaCy pipeline, which is only loaded the first time it is used """
+
+    def __init__(self, model, disable):
+        self.model = model
+        self.disable = disable
+        self._nlp = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._nlp is None:
+            with self._lock:
+                if self._nlp is None:
+                    with startup.timed("spacy_load"):
+                        import spacy
+                        self._nlp = spacy.load(self.model, disable=self.disable)
+        return self._nlp
+
+    def __call__(self, text):
+        return self.load()(text)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
+nlp = LazyLanguage(SPACY_MODEL, DISABLED_COMPONENTS)
@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/1.10/ref/settings/
 
 import os
 
+# Imported first to time the startup of the worker
+from daphne_brain import startup
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -95,7 +98,7 @@ WSGI_APPLICATION = 'daphne_brain.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'daphne',
+        'NAME': os.environ.get('DATABASE_NAME', 'daphne'),
         'USER': os.environ['USER'],
         'PASSWORD': os.environ['PASSWORD'],
         'HOST': 'localhost',
@@ -189,6 +192,40 @@ EDL_DATABASE = {
     'database': 'edldatabase'
 }
 
+# Connection pool shared by all the requests of a worker, for each of the databases above
+ALCHEMY_POOL = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True
+}
+
+
+# 'numpy' runs the question classifiers exported with manage.py export_classifiers without TensorFlow, falling back to
+# TensorFlow for the ones not exported yet. 'tensorflow' always restores them from their checkpoints
+CLASSIFIER_ENGINE = 'numpy'
+
+
+# Skills answering the same question run in parallel, each one with its own timeout in seconds
+SKILL_WORKERS = 8
+SKILL_TIMEOUTS = {
+    'iFEED': 60,
+    'VASSAR': 30,
+    'Critic': 30,
+    'Historian': 15,
+    'EDL': 30
+}
+
+
+# Whether the answers to the last command of each user are also saved in the database, which is done in the background
+PERSIST_ANSWERS = True
+
+
+# The benchmark_qa command replaces the designs of its own user, so it only runs with this database selected
+# (e.g. DATABASE_NAME=daphne_benchmark python manage.py benchmark_qa)
+BENCHMARK_DATABASE = 'daphne_benchmark'
+
 
 # Session configuration
 # SESSION_ENGINE = "merge_session.merge_db"
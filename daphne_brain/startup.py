@@ -0,0 +1,41 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger('debugging')
+
+# Imported from the settings, so this is (close to) the moment the worker started loading Django
+process_start = time.monotonic()
+
+_timings = OrderedDict()
+_lock = threading.Lock()
+
+
+def record(step, seconds):
+    with _lock:
+        _timings[step] = seconds
+    logger.info("Startup: " + step + " took " + "{:.3f}".format(seconds) + "s")
+
+
+@contextmanager
+def timed(step):
+    """ Time a startup step, such as importing or loading one of the heavy NLP/ML components """
+    start = time.monotonic()
+    yield
+    record(step, time.monotonic() - start)
+
+
+def mark_ready():
+    record("django_ready", time.monotonic() - process_start)
+
+
+def report():
+    """ How long each startup step took, in seconds. Lazy steps only appear once something needed them """
+    with _lock:
+        steps = OrderedDict(_timings)
+    return {
+        "uptime": time.monotonic() - process_start,
+        "steps": steps
+    }
@@ -1,5 +1,4 @@
 #!/usr/bin/env python
-import json
 import sys,os
 import glob
 
@@ -57,13 +56,13 @@ class DataMiningClient():
         
         archs_formatted = []
         if inputType == "binary":
-            for arch in all_archs:
-                archs_formatted.append(BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+            for arch_id, inputs, outputs in all_archs.designs():
+                archs_formatted.append(BinaryInputArchitecture(arch_id, inputs, outputs))
             drivingFeatures_formatted = self.client.getDrivingFeaturesBinary(problem, behavioral, non_behavioral, archs_formatted, supp, conf, lift)
 
         elif inputType == "discrete":
-            for arch in all_archs:
-                archs_formatted.append(DiscreteInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+            for arch_id, inputs, outputs in all_archs.designs():
+                archs_formatted.append(DiscreteInputArchitecture(arch_id, inputs, outputs))
             drivingFeatures_formatted = self.client.getDrivingFeaturesDiscrete(problem, behavioral, non_behavioral, archs_formatted, supp, conf, lift)
 
         drivingFeatures = []
@@ -82,13 +81,13 @@ class DataMiningClient():
         
         archs_formatted = []
         if inputType == "binary":
-            for arch in all_archs:
-                archs_formatted.append(BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+            for arch_id, inputs, outputs in all_archs.designs():
+                archs_formatted.append(BinaryInputArchitecture(arch_id, inputs, outputs))
             drivingFeatures_formatted = self.client.getDrivingFeaturesEpsilonMOEABinary(problem, behavioral, non_behavioral, archs_formatted)
 
         elif inputType == "discrete":
-            for arch in all_archs:
-                archs_formatted.append(DiscreteInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+            for arch_id, inputs, outputs in all_archs.designs():
+                archs_formatted.append(DiscreteInputArchitecture(arch_id, inputs, outputs))
             drivingFeatures_formatted = self.client.getDrivingFeaturesEpsilonMOEADiscrete(problem, behavioral, non_behavioral, archs_formatted)
 
         drivingFeatures = []
@@ -104,8 +103,8 @@ class DataMiningClient():
         
         archs_formatted = []
         if inputType == "binary":
-            for arch in all_archs:
-                archs_formatted.append(BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+            for arch_id, inputs, outputs in all_archs.designs():
+                archs_formatted.append(BinaryInputArchitecture(arch_id, inputs, outputs))
             drivingFeatures_formatted = self.client.getDrivingFeaturesWithGeneralizationBinary(problem, behavioral, non_behavioral, archs_formatted)
 
         elif inputType == "discrete":
@@ -124,13 +123,13 @@ class DataMiningClient():
         
         archs_formatted = []
         if inputType == "binary":
-            for arch in all_archs:
-                archs_formatted.append(BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+            for arch_id, inputs, outputs in all_archs.designs():
+                archs_formatted.append(BinaryInputArchitecture(arch_id, inputs, outputs))
             drivingFeatures_formatted = self.client.runAutomatedLocalSearchBinary(problem, behavioral, non_behavioral, archs_formatted, supp, conf, lift)
 
         elif inputType == "discrete":
-            for arch in all_archs:
-                archs_formatted.append(DiscreteInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+            for arch_id, inputs, outputs in all_archs.designs():
+                archs_formatted.append(DiscreteInputArchitecture(arch_id, inputs, outputs))
             drivingFeatures_formatted = self.client.runAutomatedLocalSearchDiscrete(problem, behavioral, non_behavioral, archs_formatted, supp, conf, lift)
 
         drivingFeatures = []
@@ -149,14 +148,14 @@ class DataMiningClient():
             
             archs_formatted = []
             if inputType == "binary":
-                for arch in all_archs:
-                    archs_formatted.append(BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+                for arch_id, inputs, outputs in all_archs.designs():
+                    archs_formatted.append(BinaryInputArchitecture(arch_id, inputs, outputs))
                 drivingFeatures_formatted = self.client.getMarginalDrivingFeaturesBinary(problem, behavioral, non_behavioral, archs_formatted, 
                                                                            featureExpression, logicalConnective, supp, conf, lift)
 
             elif inputType == "discrete":
-                for arch in all_archs:
-                    archs_formatted.append(DiscreteInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+                for arch_id, inputs, outputs in all_archs.designs():
+                    archs_formatted.append(DiscreteInputArchitecture(arch_id, inputs, outputs))
                 drivingFeatures_formatted = self.client.getMarginalDrivingFeaturesDiscrete(problem, behavioral, non_behavioral, archs_formatted, 
                                                                            featureExpression, logicalConnective, supp, conf, lift)
                         
@@ -177,8 +176,8 @@ class DataMiningClient():
             
             archs_formatted = []
             if inputType == "binary":
-                for arch in all_archs:
-                    archs_formatted.append(BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+                for arch_id, inputs, outputs in all_archs.designs():
+                    archs_formatted.append(BinaryInputArchitecture(arch_id, inputs, outputs))
                 drivingFeatures_formatted = self.client.runInputGeneralizationLocalSearchBinary(problem, behavioral, non_behavioral, 
                                                                             archs_formatted, 
                                                                            featureExpression)
@@ -205,8 +204,8 @@ class DataMiningClient():
 
             archs_formatted = []
             if input_type == "binary":
-                for arch in all_archs:
-                    archs_formatted.append(BinaryInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+                for arch_id, inputs, outputs in all_archs.designs():
+                    archs_formatted.append(BinaryInputArchitecture(arch_id, inputs, outputs))
                 drivingFeatures_formatted = self.client.runAutomatedLocalSearchBinary(problem,
                                                                                       behavioral,
                                                                                       non_behavioral,
@@ -216,8 +215,8 @@ class DataMiningClient():
                                                                                       lift_threshold)
 
             elif input_type == "discrete":
-                for arch in all_archs:
-                    archs_formatted.append(DiscreteInputArchitecture(arch.id, json.loads(arch.inputs), json.loads(arch.outputs)))
+                for arch_id, inputs, outputs in all_archs.designs():
+                    archs_formatted.append(DiscreteInputArchitecture(arch_id, inputs, outputs))
                 drivingFeatures_formatted = self.client.runAutomatedLocalSearchDiscrete(problem,
                                                                                         behavioral,
                                                                                         non_behavioral,
@@ -1,9 +1,5 @@
 
-import matplotlib as mpl
-mpl.use('TkAgg')
-
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
 from sklearn.metrics.pairwise import rbf_kernel
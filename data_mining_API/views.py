@@ -2,7 +2,7 @@ import logging
 
 # Get an instance of a logger
 from auth_API.helpers import get_or_create_user_information
-from daphne_API.models import Design
+from daphne_API import dataset_cache
 
 logger = logging.getLogger('data-mining')
 
@@ -64,7 +64,7 @@ class GetDrivingFeatures(APIView):
                 non_behavioral.append(int(s))
 
             # Load architecture data from the session info
-            dataset = Design.objects.filter(eosscontext_id__exact=user_info.eosscontext.id).all()
+            dataset = dataset_cache.cache.get(user_info.eosscontext)
 
             problem = request.POST['problem']
             inputType = request.POST['input_type']
@@ -118,7 +118,7 @@ class GetDrivingFeaturesEpsilonMOEA(APIView):
                 non_behavioral.append(int(s))
 
             # Load architecture data from the session info
-            dataset = Design.objects.filter(eosscontext_id__exact=user_info.eosscontext.id).all()
+            dataset = dataset_cache.cache.get(user_info.eosscontext)
 
             problem = request.POST['problem']
             inputType = request.POST['input_type']
@@ -170,7 +170,7 @@ class GetDrivingFeaturesWithGeneralization(APIView):
                 non_behavioral.append(int(s))
 
             # Load architecture data from the session info
-            dataset = Design.objects.filter(eosscontext_id__exact=user_info.eosscontext.id).all()
+            dataset = dataset_cache.cache.get(user_info.eosscontext)
 
             problem = request.POST['problem']
             inputType = request.POST['input_type']
@@ -227,7 +227,7 @@ class GetDrivingFeaturesAutomated(APIView):
                 non_behavioral.append(int(s))
 
             # Load architecture data from the session info
-            dataset = Design.objects.filter(eosscontext_id__exact=user_info.eosscontext.id).all()
+            dataset = dataset_cache.cache.get(user_info.eosscontext)
 
             problem = request.POST['problem']
             inputType = request.POST['input_type']
@@ -274,7 +274,7 @@ class GetMarginalDrivingFeatures(APIView):
             logicalConnective = request.POST['logical_connective']      
 
             # Load architecture data from the session info
-            dataset = Design.objects.filter(eosscontext_id__exact=user_info.eosscontext.id).all()
+            dataset = dataset_cache.cache.get(user_info.eosscontext)
 
             problem = request.POST['problem']
             inputType = request.POST['input_type']
@@ -314,7 +314,7 @@ class GeneralizationLocalSearch(APIView):
             featureExpression = request.POST['featureExpression']      
 
             # Load architecture data from the session info
-            dataset = Design.objects.filter(eosscontext_id__exact=user_info.eosscontext.id).all()
+            dataset = dataset_cache.cache.get(user_info.eosscontext)
 
             problem = request.POST['problem']
             inputType = request.POST['input_type']